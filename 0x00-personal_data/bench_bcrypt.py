@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Benchmark of batch bcrypt hashing throughput against the number of
+worker threads
+"""
+
+import os
+import time
+
+from encrypt_password import hash_passwords, verify_many
+
+
+def main():
+    """a function that prints hashes and checks per second for 1 up to
+    the number of CPUs worker threads"""
+    passwords = ["password{}".format(i) for i in range(64)]
+    workers = 1
+    print("{:>7} {:>10} {:>10}".format("workers", "hash/s", "verify/s"))
+    while True:
+        start = time.perf_counter()
+        hashes = hash_passwords(passwords, max_workers=workers)
+        hashed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        assert all(verify_many(zip(hashes, passwords), max_workers=workers))
+        verified = time.perf_counter() - start
+
+        print("{:>7} {:>10.1f} {:>10.1f}".format(
+            workers, len(passwords) / hashed, len(passwords) / verified))
+        if workers >= (os.cpu_count() or 1):
+            break
+        workers = min(workers * 2, os.cpu_count() or 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,15 +2,99 @@
 """
 Encrypting passwords
 """
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, Iterable, List, Tuple
+import os
+import threading
+import time
 import bcrypt
 
+_cost_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def calibrate_cost(target_ms: float = 250.0, min_cost: int = 12,
+                   max_cost: int = 31) -> int:
+    """a function that returns the highest bcrypt work factor whose hash
+    takes no longer than target_ms on this host; the target only raises
+    the cost above min_cost, never lowers it."""
+    cost = min_cost
+    while cost < max_cost:
+        start = time.perf_counter()
+        bcrypt.hashpw(b"calibration", bcrypt.gensalt(cost))
+        elapsed = (time.perf_counter() - start) * 1000
+        # each extra round of cost doubles the hashing time
+        if elapsed * 2 > target_ms:
+            break
+        cost += 1
+    return cost
+
+
+def get_cost() -> int:
+    """a function that returns the work factor for new hashes: BCRYPT_COST
+    if set, else the cost calibrated once per process for
+    BCRYPT_TARGET_MS (default 250), from BCRYPT_MIN_COST (default 12) up.
+
+    The lock keeps concurrent first callers, such as the workers of
+    hash_passwords, from timing bcrypt against each other."""
+    if os.environ.get("BCRYPT_COST"):
+        return int(os.environ["BCRYPT_COST"])
+    with _cost_lock:
+        return calibrate_cost(float(os.environ.get("BCRYPT_TARGET_MS", 250)),
+                              int(os.environ.get("BCRYPT_MIN_COST", 12)))
+
+
+def needs_rehash(hashed_password: bytes) -> bool:
+    """a function that tells whether a stored hash was made with a lower
+    work factor than the current one."""
+    if isinstance(hashed_password, str):
+        hashed_password = hashed_password.encode('utf-8')
+    return int(hashed_password.split(b'$')[2]) < get_cost()
+
 
 def hash_password(password: str) -> str:
     """a function that takes in a password string arguments and returns
     bytes."""
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+    return bcrypt.hashpw(password.encode('utf-8'),
+                         bcrypt.gensalt(get_cost()))
+
+
+def is_valid(hashed_password: bytes, password: str,
+             on_rehash: Callable[[], None] = None) -> bool:
+    """a function that expects 2 arguments and returns a boolean.
+
+    on_rehash is called when the password matches but the hash was made
+    with a lower work factor than the current one, so the caller can
+    store a fresh hash_password(password) in the background.
+    """
+    valid = bcrypt.checkpw(password.encode('utf-8'), hashed_password)
+    if valid and on_rehash is not None and needs_rehash(hashed_password):
+        on_rehash()
+    return valid
+
+
+def _max_workers(max_workers: int = None) -> int:
+    """a function that returns the concurrency limit, defaulting to the
+    number of CPUs since bcrypt releases the GIL while hashing"""
+    if max_workers is None:
+        return os.cpu_count() or 1
+    return max(1, max_workers)
+
+
+def hash_passwords(passwords: Iterable[str],
+                   max_workers: int = None) -> List[bytes]:
+    """a function that hashes many passwords on a thread pool and returns
+    the hashes in input order."""
+    get_cost()  # calibrate before the workers start hashing
+    with ThreadPoolExecutor(_max_workers(max_workers)) as executor:
+        return list(executor.map(hash_password, passwords))
 
 
-def is_valid(hashed_password: bytes, password: str) -> bool:
-    """a function that expects 2 arguments and returns a boolean."""
-    return bcrypt.checkpw(password.encode('utf-8'), hashed_password)
+def verify_many(pairs: Iterable[Tuple[bytes, str]],
+                max_workers: int = None) -> List[bool]:
+    """a function that checks many (hashed_password, password) pairs on a
+    thread pool and returns the results in input order."""
+    get_cost()  # calibrate before the workers start checking
+    with ThreadPoolExecutor(_max_workers(max_workers)) as executor:
+        return list(executor.map(lambda pair: is_valid(*pair), pairs))
@@ -3,10 +3,23 @@
 Regexing data
 """
 
-from typing import List
+from functools import lru_cache
+from operator import itemgetter
+from typing import Callable, List, Optional, Pattern, Sequence, Tuple
+from collections import deque
+import argparse
 import re
 import logging
+import multiprocessing
 import os
+import queue
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
 import mysql.connector
 
 
@@ -25,37 +38,158 @@ class RedactingFormatter(logging.Formatter):
     def format(self, record: logging.LogRecord) -> str:
         """a function that filters values in incoming log records"""
         log_message = super(RedactingFormatter, self).format(record)
-        for field in self.fields:
-            log_message = re.sub(
-                r"({}=)([^{};]+)({})".format(field,
-                                             self.SEPARATOR, self.SEPARATOR),
-                r"\1{}{}".format(self.REDACTION, self.SEPARATOR),
-                log_message
-            )
-        return log_message
+        return filter_datum(self.fields, self.REDACTION, log_message,
+                            self.SEPARATOR)
 
 
 PII_FIELDS = ["name", "email", "ssn", "password", "credit_card"]
 
 
+@lru_cache(maxsize=128)
+def _redaction_pattern(fields: Tuple[str, ...], separator: str) -> Pattern:
+    """a function that compiles the fields into a single alternation
+    pattern, cached per (fields, separator) pair"""
+    sep = re.escape(separator)
+    return re.compile(r'({})=[^{}]+{}'.format(
+        '|'.join(re.escape(field) for field in fields), sep, sep))
+
+
 def filter_datum(fields: List, redaction: str, message: str,
                  separator: str) -> str:
     """a function that returns the log message obfuscated"""
-    for i in fields:
-        obfuscate = re.sub(r'({}=)([^{}]+)({})'.format(i, separator,
-                                                       separator),
-                           r"\1{}{}".format(redaction, separator), message)
-        message = obfuscate
-    return obfuscate
+    if not fields:
+        return message
+    pattern = _redaction_pattern(tuple(fields), separator)
+    replacement = (redaction + separator).replace('\\', r'\\')
+    return pattern.sub(r'\g<1>=' + replacement, message)
+
+
+class AsyncBatchHandler(logging.Handler):
+    """ Handler that puts records on a bounded in-memory queue and lets a
+    background listener thread format, redact and write them in batches
+        """
+
+    OVERFLOW_POLICIES = ("block", "drop_oldest", "sample")
+    # how often blocked callers and the idle listener check for close()
+    POLL_INTERVAL = 0.1
+
+    def __init__(self, stream=None, queue_size: int = 10000,
+                 overflow: str = "block", batch_size: int = 256,
+                 sample_rate: int = 10):
+        super(AsyncBatchHandler, self).__init__()
+        if overflow not in self.OVERFLOW_POLICIES:
+            raise ValueError("overflow must be one of {}".format(
+                ", ".join(self.OVERFLOW_POLICIES)))
+        self.stream = stream if stream is not None else sys.stderr
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.overflow = overflow
+        self.batch_size = batch_size
+        self.sample_rate = sample_rate
+        self.queued = 0
+        self.dropped = 0
+        self._counter_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._drain,
+                                        name="user_data-log-listener",
+                                        daemon=True)
+        self._thread.start()
+
+    def _count(self, queued: int = 0, dropped: int = 0):
+        """a function that updates the queued and dropped counters"""
+        with self._counter_lock:
+            self.queued += queued
+            self.dropped += dropped
+
+    def emit(self, record: logging.LogRecord):
+        """a function that enqueues a record without formatting it, or
+        counts it as dropped once the handler is closed"""
+        if self._stopped.is_set():
+            self._count(dropped=1)
+            return
+        if self.overflow == "block":
+            while True:
+                try:
+                    self.queue.put(record, timeout=self.POLL_INTERVAL)
+                    self._count(queued=1)
+                    return
+                except queue.Full:
+                    if self._stopped.is_set():
+                        self._count(dropped=1)
+                        return
+        try:
+            self.queue.put_nowait(record)
+            self._count(queued=1)
+            return
+        except queue.Full:
+            pass
+        if self.overflow == "sample" and \
+                random.randrange(self.sample_rate) != 0:
+            self._count(dropped=1)
+            return
+        # drop the oldest queued record to make room for this one
+        try:
+            self.queue.get_nowait()
+            self._count(dropped=1)
+        except queue.Empty:
+            pass
+        try:
+            self.queue.put_nowait(record)
+            self._count(queued=1)
+        except queue.Full:
+            self._count(dropped=1)
+
+    def _drain(self):
+        """a function that writes queued records in batches until the
+        handler is closed and the queue is empty"""
+        while True:
+            try:
+                batch = [self.queue.get(timeout=self.POLL_INTERVAL)]
+            except queue.Empty:
+                if self._stopped.is_set():
+                    return
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            lines = []
+            for record in batch:
+                try:
+                    lines.append(self.format(record))
+                except Exception:
+                    self.handleError(record)
+            if lines:
+                try:
+                    self.stream.write("\n".join(lines) + "\n")
+                    self.stream.flush()
+                except Exception:
+                    self.handleError(batch[0])
 
+    def close(self):
+        """a function that flushes the queue and stops the listener"""
+        self._stopped.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        super(AsyncBatchHandler, self).close()
 
-def get_logger() -> logging.Logger:
-    """a function that returns a logger object"""
+
+def get_logger(asynchronous: bool = False, queue_size: int = 10000,
+               overflow: str = "block") -> logging.Logger:
+    """a function that returns a logger object
+
+    With asynchronous set, records go onto a bounded queue drained by a
+    background thread; overflow is one of "block", "drop_oldest" or
+    "sample".
+    """
     logger = logging.getLogger("user_data")
     logger.setLevel(logging.INFO)
     logger.propagate = False
 
-    handler = logging.StreamHandler()
+    if asynchronous:
+        handler = AsyncBatchHandler(queue_size=queue_size, overflow=overflow)
+    else:
+        handler = logging.StreamHandler()
     handler.setFormatter(RedactingFormatter(fields=PII_FIELDS))
     logger.addHandler(handler)
 
@@ -63,7 +197,15 @@ def get_logger() -> logging.Logger:
 
 
 def get_db() -> mysql.connector.connection.MySQLConnection:
-    """a function that returns a connector to the database"""
+    """a function that returns a connector to the database
+
+    When PERSONAL_DATA_DB_SQLITE names a file, a sqlite3 connection to it
+    is returned instead, as a local stand-in for MySQL.
+    """
+    sqlite_path = os.environ.get("PERSONAL_DATA_DB_SQLITE")
+    if sqlite_path:
+        return sqlite3.connect(sqlite_path, check_same_thread=False)
+
     username = os.environ.get("PERSONAL_DATA_DB_USERNAME", "root")
     password = os.environ.get("PERSONAL_DATA_DB_PASSWORD", "")
     host = os.environ.get("PERSONAL_DATA_DB_HOST", "localhost")
@@ -79,24 +221,403 @@ def get_db() -> mysql.connector.connection.MySQLConnection:
     return db
 
 
+class PooledConnection:
+    """ Checked-out pool connection: behaves like the underlying
+    connection, and close() hands it back to its pool
+        """
+
+    def __init__(self, pool: "ConnectionPool", connection, created: float):
+        self._pool = pool
+        self._created = created
+        self.connection = connection
+
+    def __getattr__(self, name: str):
+        return getattr(self.connection, name)
+
+    def close(self):
+        """a function that returns the connection to the pool"""
+        if self.connection is not None:
+            connection, self.connection = self.connection, None
+            self._pool.release(connection, self._created)
+
+    def __enter__(self) -> "PooledConnection":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ConnectionPool:
+    """ Bounded pool of database connections with health-check on
+    checkout, idle eviction, a max lifetime and wait-time metrics
+        """
+
+    def __init__(self, connect: Callable, size: int = 5,
+                 max_idle: float = 300, max_lifetime: float = 3600,
+                 timeout: float = 30):
+        self.connect = connect
+        self.size = size
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self._idle = deque()
+        self._open = 0
+        self._in_use = 0
+        self._checkouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._cond = threading.Condition()
+
+    def _expired(self, created: float, last_used: float, now: float) -> bool:
+        """a function that tells whether an idle connection is too old"""
+        return (self.max_idle and now - last_used > self.max_idle) or \
+            (self.max_lifetime and now - created > self.max_lifetime)
+
+    @staticmethod
+    def _healthy(connection) -> bool:
+        """a function that checks a connection is still usable"""
+        try:
+            is_connected = getattr(connection, "is_connected", None)
+            if is_connected is not None:
+                return is_connected()
+            connection.execute("SELECT 1")
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, connection):
+        """a function that closes a connection the pool gives up on"""
+        try:
+            connection.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._open -= 1
+            self._cond.notify()
+
+    def _discard_slot(self):
+        """a function that frees the slot of a connection never opened"""
+        with self._cond:
+            self._open -= 1
+            self._cond.notify()
+
+    def acquire(self) -> PooledConnection:
+        """a function that checks a warm connection out of the pool,
+        opening one if the pool is not full and waiting otherwise"""
+        start = time.monotonic()
+        self.evict_idle()
+        while True:
+            connection = None
+            with self._cond:
+                while not self._idle and self._open >= self.size:
+                    remaining = None
+                    if self.timeout is not None:
+                        remaining = self.timeout - (time.monotonic() - start)
+                        if remaining <= 0:
+                            raise TimeoutError("no pooled connection "
+                                               "available")
+                    self._cond.wait(remaining)
+                if self._idle:
+                    connection, created, last_used = self._idle.pop()
+                else:
+                    self._open += 1
+            if connection is None:
+                try:
+                    connection, created = self.connect(), time.monotonic()
+                except Exception:
+                    self._discard_slot()
+                    raise
+            elif self._expired(created, last_used, time.monotonic()) or \
+                    not self._healthy(connection):
+                self._discard(connection)
+                continue
+            waited = time.monotonic() - start
+            with self._cond:
+                self._in_use += 1
+                self._checkouts += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+            return PooledConnection(self, connection, created)
+
+    def release(self, connection, created: float):
+        """a function that puts a checked-out connection back"""
+        now = time.monotonic()
+        with self._cond:
+            self._in_use -= 1
+        if self.max_lifetime and now - created > self.max_lifetime:
+            self._discard(connection)
+            return
+        with self._cond:
+            self._idle.append((connection, created, now))
+            self._cond.notify()
+        # checkouts take the most recent connection, so the ones left at
+        # the other end are only closed here
+        self.evict_idle()
+
+    def evict_idle(self) -> int:
+        """a function that closes idle connections past max_idle or
+        max_lifetime and returns how many were closed"""
+        now = time.monotonic()
+        with self._cond:
+            expired = [c for c in self._idle if self._expired(*c[1:], now)]
+            self._idle = deque(c for c in self._idle
+                               if not self._expired(*c[1:], now))
+        for connection, _, _ in expired:
+            self._discard(connection)
+        return len(expired)
+
+    def stats(self) -> dict:
+        """a function that returns the pool utilization and wait-time
+        metrics"""
+        with self._cond:
+            return {
+                "size": self.size,
+                "open": self._open,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "utilization": self._in_use / self.size,
+                "checkouts": self._checkouts,
+                "wait_total": self._wait_total,
+                "wait_avg": self._wait_total / self._checkouts
+                if self._checkouts else 0.0,
+                "wait_max": self._wait_max,
+            }
+
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_pooled_db() -> PooledConnection:
+    """a function that returns a connection checked out of the
+    process-wide pool; closing it hands it back
+
+    The pool is configured from PERSONAL_DATA_DB_POOL_SIZE,
+    PERSONAL_DATA_DB_POOL_MAX_IDLE, PERSONAL_DATA_DB_POOL_MAX_LIFETIME and
+    PERSONAL_DATA_DB_POOL_TIMEOUT (seconds).
+    """
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            env = os.environ.get
+            _POOL = ConnectionPool(
+                get_db,
+                size=int(env("PERSONAL_DATA_DB_POOL_SIZE", 5)),
+                max_idle=float(env("PERSONAL_DATA_DB_POOL_MAX_IDLE", 300)),
+                max_lifetime=float(env("PERSONAL_DATA_DB_POOL_MAX_LIFETIME",
+                                       3600)),
+                timeout=float(env("PERSONAL_DATA_DB_POOL_TIMEOUT", 30)))
+    return _POOL.acquire()
+
+
+def _row_formatter(fields: List) -> Callable[[Sequence], str]:
+    """a function that precomputes, from the column names, which values
+    are PII and returns a function turning a row into a log message"""
+    template = '; '.join(
+        "{}={}".format(field, RedactingFormatter.REDACTION)
+        if field in PII_FIELDS else field.replace('{', '{{').replace(
+            '}', '}}') + "={}"
+        for field in fields)
+    clear = [i for i, field in enumerate(fields) if field not in PII_FIELDS]
+    if not clear:
+        return lambda row: template
+    if len(clear) == 1:
+        return lambda row: template.format(row[clear[0]])
+    getter = itemgetter(*clear)
+    return lambda row: template.format(*getter(row))
+
+
+def _export_key() -> str:
+    """a function that returns the column the users table is sharded on"""
+    key = os.environ.get("PERSONAL_DATA_EXPORT_KEY", "id")
+    if not re.fullmatch(r"\w+", key):
+        raise ValueError("invalid export key column: {}".format(key))
+    return key
+
+
+# emit() implementations that do nothing but write to handler.stream
+_BATCH_EMITS = (logging.StreamHandler.emit, logging.FileHandler.emit)
+
+
+def _log_batch(logger: logging.Logger, messages: List[str]):
+    """a function that logs messages at INFO level, handing the whole
+    batch to each plain stream handler as a single write"""
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    records = [logger.makeRecord(logger.name, logging.INFO, __file__, 0,
+                                 message, None, None)
+               for message in messages]
+    if logger.propagate or logger.filters:
+        for record in records:
+            logger.handle(record)
+        return
+    for handler in logger.handlers:
+        # only a plain StreamHandler or FileHandler is written to directly;
+        # subclasses with their own emit(), such as the rotating file
+        # handlers, get every record through it
+        if type(handler).emit not in _BATCH_EMITS or handler.stream is None:
+            for record in records:
+                handler.handle(record)
+            continue
+        accepted = [record for record in records
+                    if record.levelno >= handler.level and
+                    handler.filter(record)]
+        if not accepted:
+            continue
+        handler.acquire()
+        try:
+            handler.stream.write("".join(
+                handler.format(record) + handler.terminator
+                for record in accepted))
+            handler.flush()
+        except Exception:
+            handler.handleError(accepted[0])
+        finally:
+            handler.release()
+
+
+def export_users(db, logger: logging.Logger, batch_size: int = 1000,
+                 key_range: Optional[Tuple[int, int]] = None) -> int:
+    """a function that streams the users table to the logger batch by
+    batch on an unbuffered cursor, writing each batch at once, and
+    returns the number of rows
+
+    key_range restricts the export to rows whose export key lies in the
+    half-open range [low, high).
+    """
+    if isinstance(getattr(db, "connection", db), sqlite3.Connection):
+        cursor, marker = db.cursor(), "?"
+    else:
+        cursor, marker = db.cursor(buffered=False), "%s"
+    if key_range is None:
+        cursor.execute("SELECT * FROM users;")
+    else:
+        key = _export_key()
+        cursor.execute("SELECT * FROM users WHERE {0} >= {1} AND {0} < {1} "
+                       "ORDER BY {0};".format(key, marker), key_range)
+    to_message = _row_formatter([i[0] for i in cursor.description])
+
+    count = 0
+    rows = cursor.fetchmany(batch_size)
+    while rows:
+        _log_batch(logger, [to_message(row) for row in rows])
+        count += len(rows)
+        rows = cursor.fetchmany(batch_size)
+
+    cursor.close()
+    return count
+
+
 def main():
     """a main function that takes no arguments and returns nothing."""
+    batch_size = int(os.environ.get("PERSONAL_DATA_EXPORT_BATCH_SIZE",
+                                    1000))
     db = get_db()
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM users;")
-    fields = [i[0] for i in cursor.description]
+    logger = get_logger()
+
+    start = time.perf_counter()
+    count = export_users(db, logger, batch_size)
+    elapsed = time.perf_counter() - start
+    db.close()
+
+    print("exported {} rows in {:.2f}s ({:.0f} rows/s)".format(
+        count, elapsed, count / elapsed if elapsed else 0), file=sys.stderr)
 
-    logger = logging.getLogger("user_data")
-    for row in cursor:
-        log_message = '; '.join([f"{fields[i]}={RedactingFormatter.REDACTION}"
-                                 if fields[i]
-                                in PII_FIELDS else f"{fields[i]}={row[i]}"
-                                for i in range(len(row))])
-        logger.info(log_message)
 
+def _key_ranges(db, shards: int) -> List[Tuple[int, int]]:
+    """a function that splits the export key space of the users table
+    into at most shards contiguous half-open ranges"""
+    key = _export_key()
+    cursor = db.cursor()
+    cursor.execute("SELECT MIN({0}), MAX({0}) FROM users;".format(key))
+    low, high = cursor.fetchone()
     cursor.close()
+    if low is None:
+        return []
+    high += 1
+    step = max(1, -(-(high - low) // shards))
+    return [(start, min(start + step, high))
+            for start in range(low, high, step)]
+
+
+def _export_shard(args: Tuple[int, Tuple[int, int], str, int]) -> int:
+    """a function run in a worker process that exports one key range,
+    over its own connection, to its own file"""
+    shard, key_range, file_path, batch_size = args
+    # a private logger named like get_logger()'s, so the lines match the
+    # single-process export, without handlers inherited from the parent
+    logger = logging.Logger("user_data", logging.INFO)
+    handler = logging.FileHandler(file_path, mode='w')
+    handler.setFormatter(RedactingFormatter(fields=PII_FIELDS))
+    logger.addHandler(handler)
+
+    db = get_db()
+    try:
+        return export_users(db, logger, batch_size, key_range)
+    finally:
+        db.close()
+        logger.removeHandler(handler)
+        handler.close()
+
+
+def export_sharded(shards: int, workers: int = None,
+                   output_dir: str = None, batch_size: int = 1000) -> int:
+    """a function that exports the users table in primary-key shards,
+    each redacted by its own worker process, and returns the row count
+
+    Shards are written to users.<shard>.log in output_dir, or merged in
+    key order onto stderr, where get_logger() writes, when no output_dir
+    is given.
+    """
+    db = get_db()
+    ranges = _key_ranges(db, shards)
     db.close()
 
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+    target_dir = output_dir or tempfile.mkdtemp(prefix="user_data.")
+    paths = [os.path.join(target_dir, "users.{}.log".format(shard))
+             for shard in range(len(ranges))]
+    jobs = [(shard, key_range, paths[shard], batch_size)
+            for shard, key_range in enumerate(ranges)]
+    try:
+        with multiprocessing.Pool(workers) as pool:
+            count = sum(pool.map(_export_shard, jobs))
+        if output_dir is None:
+            for file_path in paths:
+                with open(file_path, 'r') as f:
+                    shutil.copyfileobj(f, sys.stderr)
+            sys.stderr.flush()
+    finally:
+        if output_dir is None:
+            shutil.rmtree(target_dir, ignore_errors=True)
+    return count
+
+
+def cli():
+    """a function that runs the single-process or the sharded export
+    depending on the command line"""
+    parser = argparse.ArgumentParser(description="Redacted users export")
+    parser.add_argument("--shards", type=int, default=1,
+                        help="number of primary-key ranges to export")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: CPU count)")
+    parser.add_argument("--output-dir", default=None,
+                        help="write one file per shard instead of merging "
+                        "them onto stderr")
+    args = parser.parse_args()
+    if args.shards <= 1:
+        return main()
+
+    batch_size = int(os.environ.get("PERSONAL_DATA_EXPORT_BATCH_SIZE",
+                                    1000))
+    start = time.perf_counter()
+    count = export_sharded(args.shards, args.workers, args.output_dir,
+                           batch_size)
+    elapsed = time.perf_counter() - start
+    print("exported {} rows in {:.2f}s ({:.0f} rows/s)".format(
+        count, elapsed, count / elapsed if elapsed else 0), file=sys.stderr)
+
 
 if __name__ == '__main__':
-    main()
+    cli()
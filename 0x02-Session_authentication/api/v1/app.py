@@ -1,11 +1,13 @@
 #!/usr/bin/env python3
 """Route module for the API
 """
+from contextlib import contextmanager
 from os import getenv
+from time import perf_counter
 from api.v1.views import app_views
 from flask import Flask, jsonify, abort, request
 from flask_cors import CORS
-from api.v1.auth.auth import Auth
+from api.v1.auth.auth import Auth, ExcludedPaths
 from api.v1.auth.basic_auth import BasicAuth
 from api.v1.auth.session_auth import SessionAuth
 from api.v1.auth.session_exp_auth import SessionExpAuth
@@ -30,6 +32,29 @@ elif auth_type == 'session_db_auth':
 else:
     auth = Auth()
 
+# Paths served without authentication, compiled once at start
+excluded_paths = ExcludedPaths(['/api/v1/status/', '/api/v1/unauthorized/',
+                                '/api/v1/forbidden/', '/api/v1/stat*',
+                                '/api/v1/auth_session/login/'])
+
+# Report how long each authentication stage took in a Server-Timing
+# response header when AUTH_TIMING=1
+auth_timing = getenv('AUTH_TIMING', '0') == '1'
+
+
+@contextmanager
+def auth_stage(name: str):
+    """Times one stage of handle_request into request.auth_timings.
+
+    Args:
+        name (str): The name of the stage.
+    """
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        request.auth_timings.append((name, perf_counter() - start))
+
 
 @app.before_request
 def handle_request():
@@ -45,21 +70,40 @@ def handle_request():
         HTTP 403 Forbidden: If the user does not have permission to
         access the resource.
     """
-    paths = ['/api/v1/status/', '/api/v1/unauthorized/',
-             '/api/v1/forbidden/', '/api/v1/stat*',
-             '/api/v1/auth_session/login/'
-             ]
+    # the principal is resolved once here and reused by the views
+    request.current_user = None
+    request.auth_timings = []
     if auth is None:
         return
-    if not auth.require_auth(request.path, paths):
+    with auth_stage('require_auth'):
+        required = auth.require_auth(request.path, excluded_paths)
+    if not required:
         return
-    if auth.authorization_header(request) is None and auth.session_cookie(
-            request) is None:
+    with auth_stage('credentials'):
+        has_credentials = auth.authorization_header(request) is not None \
+            or auth.session_cookie(request) is not None
+    if not has_credentials:
         return None, abort(401)
-    if auth.current_user(request) is not None:
-        request.current_user = auth.current_user(request)
-    else:
+    with auth_stage('current_user'):
+        user = auth.current_user(request)
+    if user is None:
         abort(403)
+    request.current_user = user
+
+
+@app.after_request
+def add_auth_timing(response):
+    """Adds the authentication stage timings as a Server-Timing header.
+
+    Returns:
+        The response, with the header when AUTH_TIMING=1.
+    """
+    timings = getattr(request, 'auth_timings', None)
+    if auth_timing and timings:
+        response.headers['Server-Timing'] = ', '.join(
+            '{};dur={:.3f}'.format(name, seconds * 1000)
+            for name, seconds in timings)
+    return response
 
 
 @app.errorhandler(403)
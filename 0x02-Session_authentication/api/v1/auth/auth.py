@@ -1,8 +1,57 @@
 #!/usr/bin/env python3
 """Authentication class"""
 
-from typing import List, TypeVar
+from functools import lru_cache
+from typing import Iterable, List, TypeVar
 from os import getenv
+import re
+
+
+class ExcludedPaths:
+    """
+    Compiled list of paths excluded from authentication.
+
+    Entries ending with '*' exclude every path starting with the rest of
+    the entry; the other entries exclude one path, with or without a
+    trailing slash. The wildcard prefixes are compiled into a single
+    anchored regex, so matching does not depend on the number of entries
+    in Python code.
+    """
+
+    def __init__(self, excluded_paths: Iterable[str]):
+        """
+        Compile the excluded paths.
+
+        Args:
+            excluded_paths (Iterable[str]): The paths excluded from
+            authentication.
+        """
+        excluded_paths = list(excluded_paths)
+        self.exact = frozenset(excluded_paths)
+        prefixes = [x.rstrip('*') for x in excluded_paths if x.endswith('*')]
+        self.prefix = re.compile('|'.join(map(re.escape, prefixes))) \
+            if prefixes else None
+
+    def matches(self, path: str) -> bool:
+        """
+        Check if a path is excluded from authentication.
+
+        Args:
+            path (str): The path of the resource being accessed.
+
+        Returns:
+            bool: True if the path is excluded.
+        """
+        if self.prefix is not None and self.prefix.match(path):
+            return True
+        path_with_slash = path if path.endswith('/') else path + '/'
+        return path_with_slash in self.exact
+
+
+@lru_cache(maxsize=32)
+def _compile_excluded_paths(excluded_paths: tuple) -> ExcludedPaths:
+    """Compile a list of excluded paths once per distinct list."""
+    return ExcludedPaths(excluded_paths)
 
 
 class Auth:
@@ -35,7 +84,7 @@ class Auth:
         Args:
             path (str): The path of the resource being accessed.
             excluded_paths (List[str]): A list of paths that are excluded
-            from authentication.
+            from authentication, or an ExcludedPaths compiled from it.
 
         Returns:
             bool: True if authentication is required, False if the path
@@ -43,14 +92,9 @@ class Auth:
         """
         if path is None or excluded_paths is None:
             return True
-        path_with_slash = path if path.endswith('/') else path + '/'
-        excluded_path = [x.rstrip('*')
-                         for x in excluded_paths if x.endswith('*')]
-        for exclude in excluded_path:
-            if path.startswith(exclude):
-                return False
-
-        return path_with_slash not in excluded_paths
+        if not isinstance(excluded_paths, ExcludedPaths):
+            excluded_paths = _compile_excluded_paths(tuple(excluded_paths))
+        return not excluded_paths.matches(path)
 
     def authorization_header(self, request=None) -> str:
         """
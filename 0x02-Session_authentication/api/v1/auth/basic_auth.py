@@ -1,9 +1,16 @@
 #!/usr/bin/env python3
 """This module defines the BasicAuth class for basic authentication."""
 
+from collections import OrderedDict
+from os import getenv
+from threading import Lock
 from typing import TypeVar
 from .auth import Auth
 import base64
+import hashlib
+import hmac
+import secrets
+import time
 from models.user import User
 
 
@@ -14,8 +21,72 @@ class BasicAuth(Auth):
     This class provides methods for basic authentication, including extracting
     and decoding authorization headers, extracting user credentials, and
     retrieving user objects based on credentials.
+
+    Verified Authorization headers are cached for BASIC_AUTH_CACHE_TTL
+    seconds (30 by default, 0 disables the cache), keyed by an HMAC of
+    the header under a per-process secret so no credential is kept in
+    memory.
     """
 
+    def __init__(self):
+        """Initialize the verified-credential cache."""
+        super().__init__()
+        try:
+            self.cache_ttl = float(getenv('BASIC_AUTH_CACHE_TTL', 30))
+        except (Exception):
+            self.cache_ttl = 30
+        try:
+            self.cache_size = int(getenv('BASIC_AUTH_CACHE_SIZE', 1024))
+        except (Exception):
+            self.cache_size = 1024
+        self._cache_key = secrets.token_bytes(32)
+        self._cache = OrderedDict()
+        self._cache_lock = Lock()
+
+    def _cached_user(self, header_key: bytes) -> TypeVar('User'):
+        """
+        Retrieve the user a cached header was verified for.
+
+        The entry only counts while it has not expired and the user still
+        exists with the email and password hash it was verified against,
+        so saving a new password or removing the user invalidates it.
+
+        Args:
+            header_key (bytes): The HMAC of the authorization header.
+
+        Returns:
+            TypeVar('User'): The User object, or None on a miss.
+        """
+        with self._cache_lock:
+            entry = self._cache.get(header_key)
+            if entry is not None:
+                self._cache.move_to_end(header_key)
+        if entry is None:
+            return None
+        user_id, email, password, expiry = entry
+        user = User.get(user_id)
+        if expiry < time.monotonic() or user is None or \
+                user.email != email or user.password != password:
+            with self._cache_lock:
+                self._cache.pop(header_key, None)
+            return None
+        return user
+
+    def _cache_user(self, header_key: bytes, user: TypeVar('User')):
+        """
+        Remember the user a header was verified for.
+
+        Args:
+            header_key (bytes): The HMAC of the authorization header.
+            user (TypeVar('User')): The authenticated user.
+        """
+        with self._cache_lock:
+            self._cache[header_key] = (user.id, user.email, user.password,
+                                       time.monotonic() + self.cache_ttl)
+            self._cache.move_to_end(header_key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
     def extract_base64_authorization_header(self, authorization_header: str
                                             ) -> str:
         """Extract the base64 portion of an authorization header.
@@ -135,6 +206,14 @@ class BasicAuth(Auth):
         if auth_header is None:
             return None
 
+        header_key = None
+        if self.cache_ttl > 0 and isinstance(auth_header, str):
+            header_key = hmac.new(self._cache_key, auth_header.encode(),
+                                  hashlib.sha256).digest()
+            user = self._cached_user(header_key)
+            if user is not None:
+                return user
+
         base64_credentials = self.extract_base64_authorization_header(
             auth_header)
 
@@ -155,4 +234,6 @@ class BasicAuth(Auth):
         # Get the user based on the credentials
         user = self.user_object_from_credentials(username, password)
 
+        if user is not None and header_key is not None:
+            self._cache_user(header_key, user)
         return user
@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 """Session Authentication class"""
 from .auth import Auth
+from .session_store import session_store_from_env
+from os import getenv
 import uuid
 from models.user import User
 
@@ -9,6 +11,14 @@ class SessionAuth(Auth):
     """SessionAuth class inherits from Auth class"""
     user_id_by_session_id = {}
 
+    def __init__(self):
+        """Shares sessions across processes when SESSION_BACKEND selects
+        a backend other than the in-process memory one"""
+        super().__init__()
+        if getenv('SESSION_BACKEND', 'memory') != 'memory' and \
+                type(SessionAuth.user_id_by_session_id) is dict:
+            SessionAuth.user_id_by_session_id = session_store_from_env()
+
     def destroy_session(self, request=None):
         """Removes a users session id"""
         if request is None:
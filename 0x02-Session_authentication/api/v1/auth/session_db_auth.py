@@ -1,8 +1,12 @@
 #!/usr/bin/env python3
 """Session module."""
 
+from collections import OrderedDict
 from datetime import datetime, timedelta
+from os import getenv
+from threading import Lock
 from api.v1.auth.session_exp_auth import SessionExpAuth
+from models.base import to_datetime
 from models.user_session import UserSession
 from models.user import User
 
@@ -10,6 +14,58 @@ from models.user import User
 class SessionDBAuth(SessionExpAuth):
     """User Session Database Authentication Class."""
 
+    def __init__(self) -> None:
+        """
+        Initialize SessionDBAuth.
+
+        Sets up a bounded LRU cache mapping a session ID to its user ID
+        and expiry, sized by the SESSION_CACHE_SIZE environment variable.
+
+        :return: None
+        """
+        super().__init__()
+        try:
+            self.cache_size = int(getenv('SESSION_CACHE_SIZE'))
+        except (Exception):
+            self.cache_size = 1024
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._cache = OrderedDict()
+        self._cache_lock = Lock()
+
+    def _expiry(self, created_at) -> datetime:
+        """
+        Compute the deadline of a session.
+
+        Args:
+            created_at: The session creation time.
+
+        Returns:
+            datetime: The expiry time, or None if sessions never expire.
+        """
+        if self.session_duration <= 0:
+            return None
+        return to_datetime(created_at) + \
+            timedelta(seconds=self.session_duration)
+
+    def _cache_put(self, session_id: str, user_id: str, expiry: datetime):
+        """
+        Remember a session, evicting the least recently used one when the
+        cache is full.
+        """
+        if self.cache_size <= 0:
+            return
+        with self._cache_lock:
+            self._cache[session_id] = (user_id, expiry)
+            self._cache.move_to_end(session_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _cache_pop(self, session_id: str):
+        """Forget a cached session."""
+        with self._cache_lock:
+            self._cache.pop(session_id, None)
+
     def create_session(self, user_id: str = None) -> str:
         """
         Create a new user session.
@@ -41,6 +97,8 @@ class SessionDBAuth(SessionExpAuth):
             new_session.save()
         except (Exception):
             raise ('session not created')
+        self._cache_put(session_id, user_id,
+                        self._expiry(new_session.created_at))
         return session_id
 
     def user_id_for_session_id(self, session_id: str = None) -> str:
@@ -56,22 +114,32 @@ class SessionDBAuth(SessionExpAuth):
         if session_id is None:
             return None
 
+        with self._cache_lock:
+            entry = self._cache.get(session_id)
+            if entry is None:
+                self.cache_misses += 1
+            else:
+                self.cache_hits += 1
+                self._cache.move_to_end(session_id)
+        if entry is not None:
+            user_id, expiry = entry
+            if expiry is not None and expiry < datetime.now():
+                self._cache_pop(session_id)
+                return None
+            return user_id
+
         sessions = UserSession.search({'session_id': session_id})
 
         if not sessions or len(sessions) == 0:
             return None
 
-        if self.session_duration <= 0:
-            return sessions[0].user_id
-
-        created_at_date = sessions[0].created_at
-        if created_at_date is None:
+        if self.session_duration > 0 and sessions[0].created_at is None:
             return None
 
-        expiration_time = created_at_date + \
-            timedelta(seconds=self.session_duration)
-        if expiration_time < datetime.now():
+        expiry = self._expiry(sessions[0].created_at)
+        if expiry is not None and expiry < datetime.now():
             return None
+        self._cache_put(session_id, sessions[0].user_id, expiry)
         return sessions[0].user_id
 
     def destroy_session(self, request=None) -> bool:
@@ -94,6 +162,7 @@ class SessionDBAuth(SessionExpAuth):
             sessions = UserSession.search({'session_id': session_id})
         except Exception:
             return False
+        self._cache_pop(session_id)
         if len(sessions) <= 0:
             return False
         sessions[0].remove()
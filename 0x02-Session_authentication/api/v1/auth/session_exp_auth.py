@@ -3,6 +3,7 @@
 
 from datetime import datetime, timedelta
 from api.v1.auth.session_auth import SessionAuth
+from api.v1.auth.session_store import session_store_from_env
 from os import getenv
 
 
@@ -16,6 +17,11 @@ class SessionExpAuth(SessionAuth):
         Inherits from SessionAuth and sets session_duration attribute based on
         the SESSION_DURATION environment variable.
 
+        Sessions are kept in the store selected by SESSION_BACKEND and
+        shared by the class, which forgets them once session_duration has
+        passed. SESSION_MAX caps the number of sessions and
+        SESSION_SWEEP_INTERVAL starts a background sweeper.
+
         :return: None
         """
         super().__init__()
@@ -25,6 +31,10 @@ class SessionExpAuth(SessionAuth):
         except (Exception):
             self.session_duration = 0
 
+        if 'user_id_by_session_id' not in SessionExpAuth.__dict__:
+            SessionExpAuth.user_id_by_session_id = session_store_from_env(
+                ttl=max(self.session_duration, 0))
+
     def create_session(self, user_id: str = None) -> str:
         """
         Create a session and add it to the user_id_by_session_id dictionary.
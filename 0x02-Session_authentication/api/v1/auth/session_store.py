@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""Session stores
+
+SessionAuth keeps its sessions in a mapping from session ID to session
+value. The stores below can stand in for the default in-process dict:
+
+- ExpiringSessionStore: in memory, with expiry and a size cap
+- SQLiteSessionStore: a SQLite file shared by every process on the host
+- UnixSocketSessionStore: a client of a SessionServer process holding an
+  ExpiringSessionStore, reached over a Unix socket
+
+session_store_from_env() picks one from the SESSION_BACKEND environment
+variable ("memory", "sqlite" or "socket") and SESSION_BACKEND_PATH.
+"""
+
+from collections.abc import MutableMapping
+from datetime import datetime
+from heapq import heappop, heappush
+from os import getenv, path, remove
+from threading import Event, Lock, Thread, local
+import json
+import socket
+import socketserver
+import sqlite3
+import sys
+import time
+
+
+class ExpiringSessionStore(MutableMapping):
+    """
+    Dictionary of sessions that forgets each entry once its time to live
+    has passed.
+
+    Deadlines are kept in a min-heap, so expired sessions are evicted in
+    amortized O(log n) on every access, or by an optional background
+    sweeper thread. A max_sessions cap evicts the oldest sessions first.
+    """
+
+    def __init__(self, ttl: float = 0, max_sessions: int = 0,
+                 sweep_interval: float = 0) -> None:
+        """
+        Initialize the store.
+
+        :param ttl: Seconds a session lives, 0 for no expiry.
+        :param max_sessions: Maximum number of sessions kept, 0 for no cap.
+        :param sweep_interval: Seconds between background sweeps, 0 to
+            only evict on access.
+        :return: None
+        """
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions = {}
+        self._deadlines = {}
+        self._heap = []
+        self._lock = Lock()
+        self._stop = Event()
+        self._sweeper = None
+        if sweep_interval > 0:
+            self._sweeper = Thread(target=self._sweep_loop,
+                                   args=(sweep_interval,),
+                                   name="session-sweeper", daemon=True)
+            self._sweeper.start()
+
+    def _evict_expired(self, now: float) -> int:
+        """
+        Drop every session whose deadline has passed. The lock is held.
+
+        :param now: Current monotonic time.
+        :return: Number of sessions evicted.
+        """
+        evicted = 0
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            deadline, session_id = heappop(heap)
+            # skip heap entries left behind by overwritten sessions
+            if self._deadlines.get(session_id) == deadline:
+                del self._deadlines[session_id]
+                del self._sessions[session_id]
+                evicted += 1
+        return evicted
+
+    def sweep(self) -> int:
+        """
+        Evict expired sessions now.
+
+        :return: Number of sessions evicted.
+        """
+        with self._lock:
+            return self._evict_expired(time.monotonic())
+
+    def _sweep_loop(self, interval: float) -> None:
+        """Body of the background sweeper thread."""
+        while not self._stop.wait(interval):
+            self.sweep()
+
+    def close(self) -> None:
+        """Stop the background sweeper, if any."""
+        self._stop.set()
+
+    def __getitem__(self, session_id: str):
+        with self._lock:
+            self._evict_expired(time.monotonic())
+            return self._sessions[session_id]
+
+    def __setitem__(self, session_id: str, value) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._evict_expired(now)
+            self._sessions.pop(session_id, None)
+            self._sessions[session_id] = value
+            self._deadlines.pop(session_id, None)
+            if self.ttl > 0:
+                deadline = now + self.ttl
+                self._deadlines[session_id] = deadline
+                heappush(self._heap, (deadline, session_id))
+            while self.max_sessions > 0 and \
+                    len(self._sessions) > self.max_sessions:
+                oldest = next(iter(self._sessions))
+                del self._sessions[oldest]
+                self._deadlines.pop(oldest, None)
+
+    def __delitem__(self, session_id: str) -> None:
+        with self._lock:
+            del self._sessions[session_id]
+            self._deadlines.pop(session_id, None)
+
+    def __iter__(self):
+        with self._lock:
+            self._evict_expired(time.monotonic())
+            return iter(list(self._sessions))
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._evict_expired(time.monotonic())
+            return len(self._sessions)
+
+
+def _encode(value) -> str:
+    """Serialize a session value, such as a user ID or a dictionary
+    holding a created_at datetime, to JSON."""
+    def default(obj):
+        if isinstance(obj, datetime):
+            return {'__datetime__': obj.isoformat()}
+        raise TypeError(repr(obj))
+    return json.dumps(value, default=default)
+
+
+def _decode(text: str):
+    """Deserialize a session value written by _encode."""
+    def object_hook(obj):
+        if len(obj) == 1 and '__datetime__' in obj:
+            return datetime.fromisoformat(obj['__datetime__'])
+        return obj
+    return json.loads(text, object_hook=object_hook)
+
+
+class SQLiteSessionStore(MutableMapping):
+    """
+    Sessions kept in a SQLite file, so every worker process on the host
+    sees the same sessions.
+    """
+
+    PURGE_EVERY = 100
+
+    def __init__(self, file_path: str, ttl: float = 0,
+                 max_sessions: int = 0) -> None:
+        """
+        Initialize the store, creating its table if needed.
+
+        :param file_path: SQLite database file.
+        :param ttl: Seconds a session lives, 0 for no expiry.
+        :param max_sessions: Maximum number of sessions kept, 0 for no cap.
+        :return: None
+        """
+        self.file_path = file_path
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._local = local()
+        self._writes = 0
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "expires REAL)")
+
+    def _conn(self) -> sqlite3.Connection:
+        """Return the connection of the calling thread."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.file_path, timeout=30,
+                                   isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def purge(self) -> int:
+        """
+        Delete expired sessions and the oldest ones beyond max_sessions.
+
+        :return: Number of sessions deleted.
+        """
+        conn = self._conn()
+        deleted = conn.execute("DELETE FROM sessions WHERE expires <= ?",
+                               (time.time(),)).rowcount
+        if self.max_sessions > 0:
+            deleted += conn.execute(
+                "DELETE FROM sessions WHERE rowid IN (SELECT rowid FROM "
+                "sessions ORDER BY rowid DESC LIMIT -1 OFFSET ?)",
+                (self.max_sessions,)).rowcount
+        return deleted
+
+    def __getitem__(self, session_id: str):
+        row = self._conn().execute(
+            "SELECT value FROM sessions WHERE session_id = ? AND "
+            "(expires IS NULL OR expires > ?)",
+            (session_id, time.time())).fetchone()
+        if row is None:
+            raise KeyError(session_id)
+        return _decode(row[0])
+
+    def __setitem__(self, session_id: str, value) -> None:
+        expires = time.time() + self.ttl if self.ttl > 0 else None
+        conn = self._conn()
+        # a new rowid keeps rowid order equal to insertion order
+        conn.execute("DELETE FROM sessions WHERE session_id = ?",
+                     (session_id,))
+        conn.execute("INSERT INTO sessions VALUES (?, ?, ?)",
+                     (session_id, _encode(value), expires))
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0 or (
+                self.max_sessions > 0 and
+                self._writes % max(1, self.max_sessions // 10) == 0):
+            self.purge()
+
+    def __delitem__(self, session_id: str) -> None:
+        if self._conn().execute("DELETE FROM sessions WHERE session_id = ?",
+                                (session_id,)).rowcount == 0:
+            raise KeyError(session_id)
+
+    def __iter__(self):
+        rows = self._conn().execute(
+            "SELECT session_id FROM sessions WHERE expires IS NULL OR "
+            "expires > ? ORDER BY rowid", (time.time(),)).fetchall()
+        return iter([row[0] for row in rows])
+
+    def __len__(self) -> int:
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM sessions WHERE expires IS NULL OR "
+            "expires > ?", (time.time(),)).fetchone()[0]
+
+
+class _SessionRequestHandler(socketserver.StreamRequestHandler):
+    """Answers newline-delimited JSON requests against server.store."""
+
+    def handle(self) -> None:
+        store = self.server.store
+        for line in self.rfile:
+            request = json.loads(line)
+            op, key = request.get('op'), request.get('key')
+            response = {'ok': True}
+            try:
+                if op == 'get':
+                    response['value'] = store[key]
+                elif op == 'set':
+                    store[key] = request['value']
+                elif op == 'del':
+                    del store[key]
+                elif op == 'keys':
+                    response['value'] = list(store)
+                elif op == 'len':
+                    response['value'] = len(store)
+                else:
+                    response = {'ok': False, 'error': 'bad op'}
+            except KeyError:
+                response = {'ok': False}
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+            self.wfile.flush()
+
+
+class SessionServer(socketserver.ThreadingMixIn,
+                    socketserver.UnixStreamServer):
+    """
+    Process holding an ExpiringSessionStore for every worker on the host,
+    served over a Unix socket.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, ttl: float = 0,
+                 max_sessions: int = 0, sweep_interval: float = 0) -> None:
+        """
+        Bind the server socket, replacing a stale socket file.
+
+        :param socket_path: Path of the Unix socket.
+        :return: None
+        """
+        if path.exists(socket_path):
+            remove(socket_path)
+        self.store = ExpiringSessionStore(ttl, max_sessions, sweep_interval)
+        super().__init__(socket_path, _SessionRequestHandler)
+
+
+class UnixSocketSessionStore(MutableMapping):
+    """
+    Client of a SessionServer. Each thread keeps its own connection.
+    Session values are stored as JSON, with datetimes encoded as strings.
+    """
+
+    def __init__(self, socket_path: str) -> None:
+        """
+        Initialize the client.
+
+        :param socket_path: Path of the SessionServer Unix socket.
+        :return: None
+        """
+        self.socket_path = socket_path
+        self._local = local()
+
+    def _call(self, op: str, key: str = None, value=None):
+        """Send one request, reconnecting once if the connection broke."""
+        request = {'op': op, 'key': key}
+        if value is not None:
+            request['value'] = _encode(value)
+        payload = json.dumps(request).encode() + b"\n"
+        for attempt in (0, 1):
+            stream = getattr(self._local, 'stream', None)
+            try:
+                if stream is None:
+                    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                    sock.connect(self.socket_path)
+                    stream = sock.makefile('rwb')
+                    self._local.stream = stream
+                stream.write(payload)
+                stream.flush()
+                line = stream.readline()
+                if not line:
+                    raise ConnectionError("session server closed")
+                break
+            except OSError:
+                self._local.stream = None
+                if attempt:
+                    raise
+        response = json.loads(line)
+        if not response['ok']:
+            raise KeyError(key)
+        return response.get('value')
+
+    def __getitem__(self, session_id: str):
+        return _decode(self._call('get', session_id))
+
+    def __setitem__(self, session_id: str, value) -> None:
+        self._call('set', session_id, value)
+
+    def __delitem__(self, session_id: str) -> None:
+        self._call('del', session_id)
+
+    def __iter__(self):
+        return iter(self._call('keys'))
+
+    def __len__(self) -> int:
+        return self._call('len')
+
+
+def session_store_from_env(ttl: float = 0) -> MutableMapping:
+    """
+    Build the session store selected by SESSION_BACKEND.
+
+    :param ttl: Seconds a session lives, 0 for no expiry. The socket
+        backend uses the ttl its SessionServer was started with.
+    :return: The session store.
+    """
+    try:
+        max_sessions = int(getenv('SESSION_MAX'))
+    except (Exception):
+        max_sessions = 0
+    try:
+        sweep_interval = float(getenv('SESSION_SWEEP_INTERVAL'))
+    except (Exception):
+        sweep_interval = 0
+    backend = getenv('SESSION_BACKEND', 'memory')
+    if backend == 'sqlite':
+        return SQLiteSessionStore(
+            getenv('SESSION_BACKEND_PATH', '.db_sessions.sqlite'),
+            ttl, max_sessions)
+    if backend == 'socket':
+        return UnixSocketSessionStore(
+            getenv('SESSION_BACKEND_PATH', '/tmp/sessions.sock'))
+    return ExpiringSessionStore(ttl, max_sessions, sweep_interval)
+
+
+if __name__ == "__main__":
+    # python3 -m api.v1.auth.session_store [socket_path]
+    server = SessionServer(
+        sys.argv[1] if len(sys.argv) > 1 else
+        getenv('SESSION_BACKEND_PATH', '/tmp/sessions.sock'),
+        ttl=max(int(getenv('SESSION_DURATION') or 0), 0))
+    server.serve_forever()
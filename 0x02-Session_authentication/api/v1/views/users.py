@@ -2,18 +2,74 @@
 """ Module of Users views
 """
 from api.v1.views import app_views
-from flask import abort, jsonify, request
+from flask import Response, abort, jsonify, request
 from models.user import User
+import base64
+import binascii
+import json
+
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(user_id: str) -> str:
+    """ Opaque pagination cursor pointing after a User ID
+    """
+    return base64.urlsafe_b64encode(user_id.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> str:
+    """ User ID a pagination cursor points after, None if invalid
+    """
+    try:
+        return base64.b64decode(cursor.encode(), altchars=b'-_',
+                                validate=True).decode()
+    except (binascii.Error, UnicodeError, ValueError):
+        return None
 
 
 @app_views.route('/users', methods=['GET'], strict_slashes=False)
 def view_all_users() -> str:
     """ GET /api/v1/users
+    Query parameters (optional):
+      - limit: page size, up to MAX_PAGE_SIZE
+      - cursor: next_cursor of the previous page
+      - format=ndjson: stream one User JSON per line, starting after
+        cursor if given
     Return:
-      - list of all User objects JSON represented
+      - list of all User objects JSON represented, when neither limit
+        nor cursor is given
+      - {"users": [...], "next_cursor": ...} ordered by User ID, with
+        next_cursor null on the last page
+      - 400 if limit or cursor is invalid
     """
-    all_users = [user.to_json() for user in User.all()]
-    return jsonify(all_users)
+    after = None
+    cursor = request.args.get('cursor')
+    if cursor is not None:
+        after = decode_cursor(cursor)
+        if after is None:
+            return jsonify({'error': "Invalid cursor"}), 400
+
+    if request.args.get('format') == 'ndjson':
+        def generate():
+            for user in User.iterate(after):
+                yield json.dumps(user.to_json()) + "\n"
+        return Response(generate(), mimetype='application/x-ndjson')
+
+    limit = request.args.get('limit')
+    if limit is None and cursor is None:
+        return jsonify([user.to_json() for user in User.all()])
+    try:
+        limit = int(limit) if limit is not None else MAX_PAGE_SIZE
+    except ValueError:
+        return jsonify({'error': "Invalid limit"}), 400
+    if limit <= 0:
+        return jsonify({'error': "Invalid limit"}), 400
+    limit = min(limit, MAX_PAGE_SIZE)
+    users = User.page(after, limit + 1)
+    next_cursor = encode_cursor(users[limit - 1].id) \
+        if len(users) > limit else None
+    return jsonify({'users': [user.to_json() for user in users[:limit]],
+                    'next_cursor': next_cursor})
 
 
 @app_views.route('/users/<user_id>', methods=['GET'], strict_slashes=False)
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+""" Benchmark of the memory held by UserSession objects with slots
+against the previous __dict__ layout
+"""
+import sys
+import tracemalloc
+import uuid
+from datetime import datetime
+from models.user_session import UserSession
+
+
+class DictUserSession():
+    """ UserSession with the previous per-instance __dict__ layout
+    """
+
+    def __init__(self, **kwargs: dict):
+        """ Initialize the same attributes as UserSession
+        """
+        self.id = kwargs.get('id', str(uuid.uuid4()))
+        self.created_at = datetime.utcnow()
+        self.updated_at = datetime.utcnow()
+        self.user_id = kwargs.get('user_id')
+        self.session_id = kwargs.get('session_id')
+
+
+def measure(model: type, n_sessions: int, user_ids: list) -> int:
+    """ Return the bytes allocated to build n_sessions objects
+    """
+    tracemalloc.start()
+    objs = [model(user_id=str(user_ids[i % len(user_ids)]),
+                  session_id=str(uuid.uuid4()))
+            for i in range(n_sessions)]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objs
+    return size
+
+
+def main():
+    """ Print bytes per session for both layouts
+    """
+    n_sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    user_ids = [uuid.uuid4() for _ in range(100)]
+    print("{:>16} {:>10}".format("layout", "bytes/obj"))
+    for name, model in (("__dict__", DictUserSession),
+                        ("__slots__", UserSession)):
+        size = measure(model, n_sessions, user_ids)
+        print("{:>16} {:>10.0f}".format(name, size / n_sessions))
+
+
+if __name__ == "__main__":
+    main()
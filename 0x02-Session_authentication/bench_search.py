@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+""" Benchmark of User.search by email with and without the secondary
+index, for 10k up to 1M users
+"""
+import sys
+import timeit
+from models.base import DATA
+from models.user import User
+
+
+def populate(n_users: int):
+    """ Fill DATA with n_users users without touching the disk
+    """
+    DATA['User'] = {}
+    for i in range(n_users):
+        user = User(email="user{}@hbtn.io".format(i))
+        DATA['User'][user.id] = user
+    User.reindex()
+
+
+def main():
+    """ Print the time per lookup for each population size
+    """
+    sizes = [int(n) for n in sys.argv[1:]] or [10000, 100000, 1000000]
+    print("{:>8} {:>14} {:>14}".format("users", "scan (us)", "index (us)"))
+    for n_users in sizes:
+        populate(n_users)
+        email = "user{}@hbtn.io".format(n_users // 2)
+        number = max(1, 1000000 // n_users)
+
+        User.INDEXES = ()
+        scan = timeit.timeit(lambda: User.search({'email': email}),
+                             number=number) / number
+        User.INDEXES = ('email',)
+        index = timeit.timeit(lambda: User.search({'email': email}),
+                              number=1000) / 1000
+        print("{:>8} {:>14.1f} {:>14.1f}".format(
+            n_users, scan * 1e6, index * 1e6))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+""" Benchmark of session create + lookup throughput of each session
+backend, from several worker processes at once
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing import Pool
+from api.v1.auth.session_store import SessionServer, session_store_from_env
+
+
+def worker(n_ops: int) -> int:
+    """ Create and look up n_ops sessions through a fresh store
+    """
+    store = session_store_from_env(ttl=3600)
+    pid = os.getpid()
+    for i in range(n_ops):
+        session_id = "{}-{}".format(pid, i)
+        store[session_id] = {'user_id': str(i)}
+        assert store[session_id]['user_id'] == str(i)
+    return n_ops
+
+
+def main():
+    """ Print operations per second for each backend and process count
+    """
+    n_ops = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    tmp = tempfile.mkdtemp()
+    socket_path = os.path.join(tmp, "sessions.sock")
+    server = SessionServer(socket_path, ttl=3600)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    print("{:>8} {:>10} {:>12}".format("backend", "processes", "ops/s"))
+    for backend, backend_path in (
+            ('sqlite', os.path.join(tmp, "sessions.sqlite")),
+            ('socket', socket_path)):
+        os.environ['SESSION_BACKEND'] = backend
+        os.environ['SESSION_BACKEND_PATH'] = backend_path
+        for processes in (1, 2, 4, 8):
+            start = time.perf_counter()
+            with Pool(processes) as pool:
+                total = sum(pool.map(worker, [n_ops] * processes))
+            elapsed = time.perf_counter() - start
+            print("{:>8} {:>10} {:>12.0f}".format(
+                backend, processes, total / elapsed))
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,314 @@
 #!/usr/bin/env python3
 """ Base module
 """
-from datetime import datetime
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 from typing import TypeVar, List, Iterable
-from os import path
+from os import getenv, path
+import atexit
+import gc
+import heapq
 import json
+import mmap
+import os
+import stat
+import sys
+import tempfile
+import threading
+import time
+import traceback
 import uuid
 
 
 TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
+# "snapshot" rewrites .db_<Class>.json on every change, "journal" appends
+# one record per change to .db_<Class>.journal and compacts periodically,
+# "write_behind" marks the class dirty and lets a background thread
+# rewrite it every FLUSH_INTERVAL seconds or after FLUSH_EVERY changes
+PERSISTENCE = getenv('BASE_PERSISTENCE', 'snapshot')
+COMPACT_EVERY = int(getenv('BASE_COMPACT_EVERY', '1000'))
+FLUSH_INTERVAL = float(getenv('BASE_FLUSH_INTERVAL', '1'))
+FLUSH_EVERY = int(getenv('BASE_FLUSH_EVERY', '100'))
+# map .db_<Class>.json and build objects only when they are first accessed
+LAZY_LOAD = getenv('BASE_LAZY_LOAD', '0') == '1'
+# keep created_at/updated_at as integer seconds since the epoch, in
+# memory and on file, instead of datetime objects and strings
+EPOCH_TIMESTAMPS = getenv('BASE_EPOCH_TIMESTAMPS', '0') == '1'
+EPOCH = datetime(1970, 1, 1)
 DATA = {}
+INDEX_DATA = {}
+INDEXED_VALUES = {}
+JOURNAL_LENGTHS = {}
+DIRTY = {}
+# per class, serializes journal appends with snapshots and compactions
+_class_locks = {}
+_class_locks_lock = threading.Lock()
+# read once at import, as os.umask can only be read by setting it
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+_dirty_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_flush_wakeup = threading.Event()
+_flusher = None
+_pending = 0
+
+
+def parse_timestamp(value: str) -> datetime:
+    """ Parse a TIMESTAMP_FORMAT string, without the cost of strptime
+    """
+    if len(value) == 19 and value[10] == 'T':
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            pass
+    return datetime.strptime(value, TIMESTAMP_FORMAT)
+
+
+def format_timestamp(value: datetime) -> str:
+    """ Format a datetime as TIMESTAMP_FORMAT, without the cost of
+    strftime
+    """
+    if value.tzinfo is None and value.year >= 1000:
+        return value.isoformat('T', 'seconds')
+    return value.strftime(TIMESTAMP_FORMAT)
+
+
+def to_epoch(value) -> int:
+    """ Convert a timestamp string, naive UTC datetime or number to
+    seconds since the epoch
+    """
+    if isinstance(value, str):
+        value = parse_timestamp(value)
+    if isinstance(value, datetime):
+        return (value - EPOCH) // timedelta(seconds=1)
+    return int(value)
+
+
+def to_datetime(value) -> datetime:
+    """ Convert a timestamp string or seconds since the epoch to a naive
+    UTC datetime
+    """
+    if isinstance(value, str):
+        return parse_timestamp(value)
+    if isinstance(value, datetime):
+        return value
+    return EPOCH + timedelta(seconds=value)
+
+
+def timestamp_now():
+    """ Current time in the representation selected by EPOCH_TIMESTAMPS
+    """
+    if EPOCH_TIMESTAMPS:
+        return int(time.time())
+    return datetime.utcnow()
+
+
+def flush():
+    """ Write every class with pending write-behind changes to file
+
+    A class whose write fails stays dirty for the next flush, and the
+    first error is raised once the other classes are written
+    """
+    global _pending
+    error = None
+    with _flush_lock:
+        with _dirty_lock:
+            dirty = list(DIRTY.values())
+            DIRTY.clear()
+            _pending = 0
+        for cls in dirty:
+            try:
+                cls.save_to_file()
+            except Exception as e:
+                with _dirty_lock:
+                    DIRTY[cls.__name__] = cls
+                error = error or e
+    if error is not None:
+        raise error
+
+
+def _flush_loop():
+    """ Body of the write-behind flusher thread
+    """
+    while True:
+        _flush_wakeup.wait(FLUSH_INTERVAL)
+        _flush_wakeup.clear()
+        try:
+            flush()
+        except Exception:
+            # keep the thread alive, the failed classes are retried
+            traceback.print_exc()
+
+
+@contextmanager
+def _gc_paused():
+    """ Hold off the cyclic garbage collector, which would otherwise run
+    over and over while a large index is being allocated
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _class_lock(s_class: str) -> threading.RLock:
+    """ Lock guarding the files of one class
+    """
+    with _class_locks_lock:
+        return _class_locks.setdefault(s_class, threading.RLock())
+
+
+def _replace_file(file_path: str, data: bytes, durable: bool = True):
+    """ Atomically replace file_path with data, through a temporary file
+    of its own so that concurrent writers never share one
+    """
+    fd, tmp_path = tempfile.mkstemp(
+        prefix=path.basename(file_path) + ".", suffix=".tmp",
+        dir=path.dirname(file_path) or ".")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            if durable:
+                os.fsync(f.fileno())
+        if path.exists(file_path):
+            mode = stat.S_IMODE(os.stat(file_path).st_mode)
+        else:
+            # the mode open() would have given a new file
+            mode = 0o666 & ~_UMASK
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _file_stamp(stat: os.stat_result) -> list:
+    """ Identify one version of a snapshot file
+    """
+    return [stat.st_ino, stat.st_size, stat.st_mtime_ns]
+
+
+class LazyObjects(MutableMapping):
+    """ Objects of one class backed by a memory-mapped snapshot: each
+    object is built from its JSON line the first time it is accessed
+    """
+
+    def __init__(self, cls: type, mapped: mmap.mmap, spans: dict):
+        """ Initialize from an id -> [start, end] index into mapped
+        """
+        self._cls = cls
+        self._mapped = mapped
+        self._entries = spans
+
+    @classmethod
+    def open(cls, model: type, file_path: str):
+        """ Map a snapshot written by save_to_file and load the offsets
+        and secondary indexes of its objects, or return None if the file
+        has another layout
+
+        Both come from the index file saved next to the snapshot; without
+        a matching one, the snapshot is scanned once and the index file
+        is written for the next start
+        """
+        with open(file_path, 'rb') as f:
+            if path.getsize(file_path) == 0:
+                return None
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            stamp = _file_stamp(os.fstat(f.fileno()))
+        if mapped[:2] != b"{\n":
+            return None
+        with _gc_paused():
+            spans = model.load_index_file(stamp)
+            if spans is not None:
+                return cls(model, mapped, spans)
+            spans = cls.scan(mapped)
+            if spans is None:
+                return None
+            model.index_raw(mapped, spans)
+        model.save_index_file(spans, stamp)
+        return cls(model, mapped, spans)
+
+    @staticmethod
+    def scan(mapped: mmap.mmap) -> dict:
+        """ Return the id -> [start, end] offsets of the objects of a
+        snapshot, or None if it has another layout
+        """
+        spans = {}
+        start = 2
+        while True:
+            end = mapped.find(b"\n", start)
+            if end == -1:
+                return None
+            if mapped[start:end] == b"}":
+                return spans
+            stop = end - 1 if mapped[end - 1:end] == b"," else end
+            sep = mapped.find(b'": ', start, stop)
+            if mapped[start:start + 1] != b'"' or sep == -1 or \
+                    mapped[stop - 1:stop] != b"}":
+                return None
+            spans[json.loads(mapped[start:sep + 1])] = [sep + 3, stop]
+            start = end + 1
+
+    def raw_json(self, key: str) -> bytes:
+        """ Return the serialized object if it was never built, else None
+        """
+        value = self._entries.get(key)
+        if type(value) is not list:
+            return None
+        return self._mapped[value[0]:value[1]]
+
+    def __getitem__(self, key: str):
+        value = self._entries[key]
+        if type(value) is list:
+            value = self._cls(**json.loads(self._mapped[value[0]:value[1]]))
+            self._entries[key] = value
+        return value
+
+    def __setitem__(self, key: str, value):
+        self._entries[key] = value
+
+    def __delitem__(self, key: str):
+        del self._entries[key]
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
 
 
 class Base():
     """ Base class
+
+    Models declare their attributes in __slots__ so instances carry no
+    per-object __dict__
     """
 
+    __slots__ = ('id', 'created_at', 'updated_at')
+    # attributes with a secondary hash index used by search()
+    INDEXES = ()
+    # every slot of the class, in declaration order from Base down
+    FIELDS = __slots__
+
+    def __init_subclass__(cls, **kwargs):
+        """ Collect the slots of the new model class into FIELDS
+        """
+        super().__init_subclass__(**kwargs)
+        fields = []
+        for klass in reversed(cls.__mro__):
+            slots = klass.__dict__.get('__slots__', ())
+            if isinstance(slots, str):
+                slots = (slots,)
+            fields.extend(slot for slot in slots
+                          if slot not in ('__dict__', '__weakref__'))
+        cls.FIELDS = tuple(fields)
+
     def __init__(self, *args: list, **kwargs: dict):
         """ Initialize a Base instance
         """
@@ -23,17 +316,18 @@ class Base():
         if DATA.get(s_class) is None:
             DATA[s_class] = {}
 
-        self.id = kwargs.get('id', str(uuid.uuid4()))
+        # ids are interned so DATA keys and references share one string
+        obj_id = kwargs.get('id', str(uuid.uuid4()))
+        self.id = sys.intern(obj_id) if type(obj_id) is str else obj_id
+        convert = to_epoch if EPOCH_TIMESTAMPS else to_datetime
         if kwargs.get('created_at') is not None:
-            self.created_at = datetime.strptime(kwargs.get('created_at'),
-                                                TIMESTAMP_FORMAT)
+            self.created_at = convert(kwargs.get('created_at'))
         else:
-            self.created_at = datetime.utcnow()
+            self.created_at = timestamp_now()
         if kwargs.get('updated_at') is not None:
-            self.updated_at = datetime.strptime(kwargs.get('updated_at'),
-                                                TIMESTAMP_FORMAT)
+            self.updated_at = convert(kwargs.get('updated_at'))
         else:
-            self.updated_at = datetime.utcnow()
+            self.updated_at = timestamp_now()
 
     def __eq__(self, other: TypeVar('Base')) -> bool:
         """ Equality
@@ -48,11 +342,14 @@ class Base():
         """ Convert the object a JSON dictionary
         """
         result = {}
-        for key, value in self.__dict__.items():
+        items = [(key, getattr(self, key)) for key in self.FIELDS
+                 if hasattr(self, key)]
+        items.extend(getattr(self, '__dict__', {}).items())
+        for key, value in items:
             if not for_serialization and key[0] == '_':
                 continue
             if type(value) is datetime:
-                result[key] = value.strftime(TIMESTAMP_FORMAT)
+                result[key] = format_timestamp(value)
             else:
                 result[key] = value
         return result
@@ -64,34 +361,286 @@ class Base():
         s_class = cls.__name__
         file_path = ".db_{}.json".format(s_class)
         DATA[s_class] = {}
-        if not path.exists(file_path):
+        INDEX_DATA.pop(s_class, None)
+        INDEXED_VALUES.pop(s_class, None)
+        lazy = None
+        if path.exists(file_path) and LAZY_LOAD:
+            lazy = LazyObjects.open(cls, file_path)
+        if lazy is not None:
+            DATA[s_class] = lazy
+        elif path.exists(file_path):
+            with open(file_path, 'r') as f:
+                objs_json = json.load(f)
+                for obj_id, obj_json in objs_json.items():
+                    DATA[s_class][obj_id] = cls(**obj_json)
+        if s_class not in INDEX_DATA:
+            cls.reindex()
+        JOURNAL_LENGTHS[s_class] = cls.replay_journal()
+
+    @classmethod
+    def replay_journal(cls) -> int:
+        """ Apply the journal on top of the loaded snapshot and return
+        the number of records replayed
+        """
+        s_class = cls.__name__
+        journal_path = ".db_{}.journal".format(s_class)
+        if not path.exists(journal_path):
+            return 0
+
+        count, offset = 0, 0
+        with open(journal_path, 'rb+') as f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError
+                    record = json.loads(line)
+                except ValueError:
+                    # drop the torn write of the last record before a crash
+                    f.truncate(offset)
+                    break
+                if record['op'] == 'save':
+                    obj = cls(**record['obj'])
+                    DATA[s_class][record['id']] = obj
+                    obj._index_add()
+                else:
+                    DATA[s_class].pop(record['id'], None)
+                    cls._index_discard(record['id'])
+                offset += len(line)
+                count += 1
+        return count
+
+    @classmethod
+    def append_to_journal(cls, record: dict):
+        """ Durably append one record to the journal, compacting it into
+        the snapshot every COMPACT_EVERY records
+        """
+        s_class = cls.__name__
+        journal_path = ".db_{}.journal".format(s_class)
+        line = json.dumps(record) + "\n"
+        with _class_lock(s_class):
+            with open(journal_path, 'a') as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            JOURNAL_LENGTHS[s_class] = JOURNAL_LENGTHS.get(s_class, 0) + 1
+            if JOURNAL_LENGTHS[s_class] >= COMPACT_EVERY:
+                cls.save_to_file()
+
+    @classmethod
+    def reindex(cls):
+        """ Rebuild the secondary indexes from all objects
+        """
+        s_class = cls.__name__
+        INDEX_DATA[s_class] = {attr: {} for attr in cls.INDEXES}
+        INDEXED_VALUES[s_class] = {}
+        for obj in DATA.get(s_class, {}).values():
+            obj._index_add()
+
+    @classmethod
+    def index_raw(cls, mapped: mmap.mmap, spans: dict):
+        """ Build the secondary indexes from the serialized objects of a
+        snapshot, without building the objects
+        """
+        s_class = cls.__name__
+        INDEX_DATA[s_class] = {attr: {} for attr in cls.INDEXES}
+        INDEXED_VALUES[s_class] = {}
+        if not cls.INDEXES:
+            return
+        for obj_id, (start, end) in spans.items():
+            obj_json = json.loads(mapped[start:end])
+            cls._index_put(obj_id,
+                           [obj_json.get(attr) for attr in cls.INDEXES])
+
+    @classmethod
+    def load_index_file(cls, stamp: list) -> dict:
+        """ Load the secondary indexes saved with the snapshot identified
+        by stamp and return its object offsets, or None if the index file
+        is missing or belongs to another snapshot
+        """
+        s_class = cls.__name__
+        index_path = ".db_{}.idx".format(s_class)
+        try:
+            with open(index_path, 'r') as f:
+                saved = json.load(f)
+            if saved['snapshot'] != stamp or \
+                    saved['attributes'] != list(cls.INDEXES):
+                return None
+            ids = saved['ids']
+            offsets = iter(saved['offsets'])
+            spans = dict(zip(ids, map(list, zip(offsets, offsets))))
+            values = {obj_id: obj_values for obj_id, obj_values
+                      in zip(ids, saved['values']) if obj_values is not None}
+            indexes = {attr: {} for attr in cls.INDEXES}
+            for i, attr in enumerate(cls.INDEXES):
+                buckets = indexes[attr]
+                for obj_id, obj_values in values.items():
+                    try:
+                        buckets.setdefault(obj_values[i], []).append(obj_id)
+                    except TypeError:
+                        pass
+        except (OSError, ValueError, KeyError, IndexError, TypeError):
+            return None
+        INDEX_DATA[s_class] = indexes
+        INDEXED_VALUES[s_class] = values
+        return spans
+
+    @classmethod
+    def save_index_file(cls, spans: dict, stamp: list):
+        """ Save the object offsets and the indexed values of the snapshot
+        identified by stamp next to it, for LazyObjects.open
+        """
+        s_class = cls.__name__
+        index_path = ".db_{}.idx".format(s_class)
+        if s_class not in INDEX_DATA:
+            cls.reindex()
+        ids = list(spans)
+        values = INDEXED_VALUES[s_class]
+        try:
+            saved = json.dumps({
+                'snapshot': stamp,
+                'attributes': list(cls.INDEXES),
+                'ids': ids,
+                'offsets': [offset for obj_id in ids
+                            for offset in spans[obj_id]],
+                'values': [values.get(obj_id) for obj_id in ids]
+                if cls.INDEXES else [],
+            })
+        except TypeError:
+            # values JSON cannot hold are indexed by scanning on load
             return
+        try:
+            _replace_file(index_path, saved.encode('utf-8'), durable=False)
+        except OSError:
+            pass
 
-        with open(file_path, 'r') as f:
-            objs_json = json.load(f)
-            for obj_id, obj_json in objs_json.items():
-                DATA[s_class][obj_id] = cls(**obj_json)
+    @classmethod
+    def _index_put(cls, obj_id: str, values: list):
+        """ Index the object obj_id under the values of its INDEXES
+        """
+        s_class = cls.__name__
+        if INDEXED_VALUES[s_class].get(obj_id) == values:
+            return
+        cls._index_discard(obj_id)
+        for attr, value in zip(cls.INDEXES, values):
+            try:
+                INDEX_DATA[s_class][attr].setdefault(value, []).append(obj_id)
+            except TypeError:
+                # unhashable values are only found by a full scan
+                pass
+        INDEXED_VALUES[s_class][obj_id] = values
+
+    @classmethod
+    def _index_discard(cls, obj_id: str):
+        """ Remove the object obj_id from the secondary indexes
+        """
+        s_class = cls.__name__
+        values = INDEXED_VALUES.get(s_class, {}).pop(obj_id, None)
+        if values is None:
+            return
+        for attr, value in zip(cls.INDEXES, values):
+            try:
+                bucket = INDEX_DATA[s_class][attr].get(value)
+            except TypeError:
+                continue
+            if bucket is not None and obj_id in bucket:
+                bucket.remove(obj_id)
+                if not bucket:
+                    del INDEX_DATA[s_class][attr][value]
+
+    def _index_add(self):
+        """ Add the object to the secondary indexes
+        """
+        s_class = self.__class__.__name__
+        if not self.INDEXES or s_class not in INDEX_DATA:
+            # a missing index is built from DATA by the next search
+            return
+        self._index_put(self.id,
+                        [getattr(self, attr, None) for attr in self.INDEXES])
+
+    def _index_remove(self):
+        """ Remove the object from the secondary indexes
+        """
+        self._index_discard(self.id)
 
     @classmethod
     def save_to_file(cls):
         """ Save all objects to file
+
+        The snapshot replaces the file atomically and absorbs the journal
         """
         s_class = cls.__name__
         file_path = ".db_{}.json".format(s_class)
-        objs_json = {}
-        for obj_id, obj in DATA[s_class].items():
-            objs_json[obj_id] = obj.to_json(True)
+        journal_path = ".db_{}.journal".format(s_class)
+        with _class_lock(s_class):
+            objs = DATA[s_class]
+            # one object per line keeps the file valid JSON and lets
+            # LazyObjects index it without parsing
+            chunks = [b"{\n"]
+            offset = 2
+            spans = {}
+            for obj_id in list(objs.keys()):
+                raw = objs.raw_json(obj_id) \
+                    if isinstance(objs, LazyObjects) else None
+                if raw is None:
+                    obj = objs.get(obj_id)
+                    if obj is None:
+                        continue
+                    raw = json.dumps(obj.to_json(True)).encode('utf-8')
+                key = json.dumps(obj_id).encode('utf-8')
+                if spans:
+                    chunks.append(b",\n")
+                    offset += 2
+                start = offset + len(key) + 2
+                chunks.extend((key, b": ", raw))
+                offset = start + len(raw)
+                spans[obj_id] = [start, offset]
+            chunks.append(b"\n}\n" if spans else b"}\n")
 
-        with open(file_path, 'w') as f:
-            json.dump(objs_json, f)
+            _replace_file(file_path, b"".join(chunks))
+            if LAZY_LOAD:
+                cls.save_index_file(spans, _file_stamp(os.stat(file_path)))
+            if path.exists(journal_path):
+                os.remove(journal_path)
+            JOURNAL_LENGTHS[s_class] = 0
+
+    def persist(self, op: str):
+        """ Persist the save or remove of this object according to
+        PERSISTENCE
+        """
+        if PERSISTENCE == 'journal':
+            record = {'op': op, 'id': self.id}
+            if op == 'save':
+                record['obj'] = self.to_json(True)
+            self.__class__.append_to_journal(record)
+        elif PERSISTENCE == 'write_behind':
+            self.__class__.mark_dirty()
+        else:
+            self.__class__.save_to_file()
+
+    @classmethod
+    def mark_dirty(cls):
+        """ Schedule the class for the next write-behind flush
+        """
+        global _flusher, _pending
+        with _dirty_lock:
+            DIRTY[cls.__name__] = cls
+            _pending += 1
+            if _flusher is None:
+                _flusher = threading.Thread(target=_flush_loop,
+                                            name="base-flusher", daemon=True)
+                _flusher.start()
+                atexit.register(flush)
+            if _pending >= FLUSH_EVERY:
+                _flush_wakeup.set()
 
     def save(self):
         """ Save current object
         """
         s_class = self.__class__.__name__
-        self.updated_at = datetime.utcnow()
+        self.updated_at = timestamp_now()
         DATA[s_class][self.id] = self
-        self.__class__.save_to_file()
+        self._index_add()
+        self.persist('save')
 
     def remove(self):
         """ Remove object
@@ -99,7 +648,8 @@ class Base():
         s_class = self.__class__.__name__
         if DATA[s_class].get(self.id) is not None:
             del DATA[s_class][self.id]
-            self.__class__.save_to_file()
+            self._index_remove()
+            self.persist('remove')
 
     @classmethod
     def count(cls) -> int:
@@ -114,6 +664,30 @@ class Base():
         """
         return cls.search()
 
+    @classmethod
+    def iterate(cls, after: str = None) -> Iterable[TypeVar('Base')]:
+        """ Yield all objects ordered by id, starting after the given id,
+        building each one only when it is reached
+        """
+        s_class = cls.__name__
+        ids = sorted(obj_id for obj_id in DATA[s_class]
+                     if after is None or obj_id > after)
+        for obj_id in ids:
+            obj = DATA[s_class].get(obj_id)
+            if obj is not None:
+                yield obj
+
+    @classmethod
+    def page(cls, after: str = None, limit: int = 100) \
+            -> List[TypeVar('Base')]:
+        """ Return at most limit objects ordered by id, starting after the
+        given id
+        """
+        s_class = cls.__name__
+        ids = heapq.nsmallest(limit, (obj_id for obj_id in DATA[s_class]
+                                      if after is None or obj_id > after))
+        return [DATA[s_class][obj_id] for obj_id in ids]
+
     @classmethod
     def get(cls, id: str) -> TypeVar('Base'):
         """ Return one object by ID
@@ -124,8 +698,27 @@ class Base():
     @classmethod
     def search(cls, attributes: dict = {}) -> List[TypeVar('Base')]:
         """ Search all objects with matching attributes
+
+        An equality on an indexed attribute narrows the scan down to the
+        objects holding that value
         """
         s_class = cls.__name__
+        objs = DATA[s_class]
+        candidates = None
+        for attr in cls.INDEXES:
+            if attr not in attributes:
+                continue
+            if s_class not in INDEX_DATA:
+                cls.reindex()
+            try:
+                ids = INDEX_DATA[s_class][attr].get(attributes[attr], ())
+            except TypeError:
+                continue
+            # only the objects holding the value are built
+            candidates = [objs[obj_id] for obj_id in ids if obj_id in objs]
+            break
+        if candidates is None:
+            candidates = objs.values()
 
         def _search(obj):
             if len(attributes) == 0:
@@ -135,4 +728,4 @@ class Base():
                     return False
             return True
 
-        return list(filter(_search, DATA[s_class].values()))
+        return list(filter(_search, candidates))
@@ -1,14 +1,21 @@
 #!/usr/bin/env python3
 """ session module
 """
+import sys
 from models.base import Base
 
 
 class UserSession(Base):
     """usersession class"""
 
+    __slots__ = ('user_id', 'session_id')
+    INDEXES = ('session_id',)
+
     def __init__(self, *args: list, **kwargs: dict):
         """initailizes a session instance"""
         super().__init__(*args, **kwargs)
-        self.user_id = None
-        self.session_id = None
+        user_id = kwargs.get('user_id')
+        # many sessions share the same user id string
+        self.user_id = sys.intern(user_id) if type(user_id) is str \
+            else user_id
+        self.session_id = kwargs.get('session_id')
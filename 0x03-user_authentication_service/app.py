@@ -10,6 +10,13 @@ app = Flask(__name__)
 AUTH = Auth()
 
 
+@app.teardown_appcontext
+def release_db_session(exception: BaseException = None) -> None:
+    """Releases the request thread's database session.
+    """
+    AUTH.release_db_session()
+
+
 @app.route("/", methods=["GET"], strict_slashes=False)
 def index() -> str:
     """GET /
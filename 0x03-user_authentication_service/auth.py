@@ -1,19 +1,53 @@
 #!/usr/bin/env python3
 """A module for authentication-related routines.
 """
+import os
+import threading
+import time
 import bcrypt
 from uuid import uuid4
-from typing import Union
+from typing import Callable, Union
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm.exc import NoResultFound
 
 from db import DB
 from user import User
 
 
+_cost_lock = threading.Lock()
+_cost = None
+
+
+def _bcrypt_cost() -> int:
+    """Returns the work factor for new hashes.
+
+    `BCRYPT_COST` fixes it; otherwise it is measured once, going up from
+    `BCRYPT_MIN_COST` (12) while a hash stays within `BCRYPT_TARGET_MS`
+    (250ms).
+    """
+    global _cost
+    if os.environ.get("BCRYPT_COST"):
+        return int(os.environ["BCRYPT_COST"])
+    with _cost_lock:
+        if _cost is None:
+            cost = int(os.environ.get("BCRYPT_MIN_COST", 12))
+            target = float(os.environ.get("BCRYPT_TARGET_MS", 250)) / 1000
+            while cost < 31:
+                start = time.perf_counter()
+                bcrypt.hashpw(b"calibration", bcrypt.gensalt(cost))
+                # the next cost would take twice as long
+                if (time.perf_counter() - start) * 2 > target:
+                    break
+                cost += 1
+            _cost = cost
+        return _cost
+
+
 def _hash_password(password: str) -> bytes:
     """Hashes a password.
     """
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt())
+    return bcrypt.hashpw(password.encode("utf-8"),
+                         bcrypt.gensalt(_bcrypt_cost()))
 
 
 def _generate_uuid() -> str:
@@ -26,35 +60,56 @@ class Auth:
     """Auth class to interact with the authentication database.
     """
 
-    def __init__(self):
+    def __init__(self, db: DB = None):
         """Initializes a new Auth instance.
         """
-        self._db = DB()
+        self._db = db if db is not None else DB()
+        _bcrypt_cost()  # calibrate before the first request comes in
+
+    def release_db_session(self) -> None:
+        """Releases the database session of the calling thread.
+        """
+        self._db.remove_session()
 
     def register_user(self, email: str, password: str) -> User:
         """Adds a new user to the database.
         """
         try:
-            self._db.find_user_by(email=email)
-        except NoResultFound:
             return self._db.add_user(email, _hash_password(password))
-        raise ValueError("User {} already exists".format(email))
+        except IntegrityError:
+            raise ValueError("User {} already exists".format(email))
 
-    def valid_login(self, email: str, password: str) -> bool:
+    def valid_login(self, email: str, password: str,
+                    on_rehash: Callable[[int], None] = None) -> bool:
         """Checks if a user's login details are valid.
+
+        `on_rehash` is called with the user's id when the password matches
+        a hash made with a lower work factor than the current one, so the
+        caller can `rehash_password` in the background.
         """
         user = None
         try:
             user = self._db.find_user_by(email=email)
             if user is not None:
-                return bcrypt.checkpw(
+                valid = bcrypt.checkpw(
                     password.encode("utf-8"),
                     user.hashed_password,
                 )
+                # the cost sits in the hash, as in $2b$12$...
+                if valid and on_rehash is not None and \
+                        int(user.hashed_password[4:6]) < _bcrypt_cost():
+                    on_rehash(user.id)
+                return valid
         except NoResultFound:
             return False
         return False
 
+    def rehash_password(self, user_id: int, password: str) -> None:
+        """Stores a fresh hash of a user's password made with the current
+        work factor.
+        """
+        self._db.update_user(user_id, hashed_password=_hash_password(password))
+
     def create_session(self, email: str) -> str:
         """Creates a new session for a user.
         """
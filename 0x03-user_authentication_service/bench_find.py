@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""A statement-building benchmark for `DB.find_user_by`.
+
+Compares the previous lookup, which built a `tuple_(...).in_(...)`
+query on every call, with the cached statement of plain equality
+predicates: the time to build and compile the statement, and the time
+of a whole lookup.
+"""
+import sys
+import timeit
+
+from sqlalchemy import tuple_
+
+from db import DB, _find_user_statement
+from user import User
+
+
+def tuple_in_lookup(db: DB, **kwargs) -> User:
+    """Looks a user up the way `find_user_by` used to.
+    """
+    fields = [getattr(User, key) for key in kwargs]
+    return db._session.query(User).filter(
+        tuple_(*fields).in_([tuple(kwargs.values())])
+    ).first()
+
+
+def cached_lookup(db: DB, **kwargs) -> User:
+    """Looks a user up through the cached statement.
+    """
+    statement = _find_user_statement(tuple(sorted(kwargs)))
+    return db._session.execute(statement, kwargs).scalar()
+
+
+def per_call(func, number: int) -> float:
+    """Returns the mean time of a call to `func`, in microseconds.
+    """
+    return timeit.timeit(func, number=number) / number * 1e6
+
+
+def main() -> None:
+    """Prints the compile and lookup time of both statements.
+    """
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    db = DB("sqlite://", fresh=True)
+    user = db.add_user("bob@hbtn.io", "x")
+    db.update_user(user.id, session_id="abc")
+    dialect = db._engine.dialect
+    filters = {"email": "bob@hbtn.io", "session_id": "abc"}
+
+    def compile_tuple_in():
+        fields = [getattr(User, key) for key in filters]
+        db._session.query(User).filter(
+            tuple_(*fields).in_([tuple(filters.values())])
+        ).statement.compile(dialect=dialect)
+
+    def compile_cached():
+        _find_user_statement(tuple(sorted(filters))).compile(dialect=dialect)
+
+    print("{:>10} {:>14} {:>14}".format(
+        "query", "compile (us)", "lookup (us)"))
+    for name, compile_, lookup in (
+            ("tuple_in", compile_tuple_in, tuple_in_lookup),
+            ("cached", compile_cached, cached_lookup)):
+        assert lookup(db, **filters).id == user.id
+        print("{:>10} {:>14.1f} {:>14.1f}".format(
+            name, per_call(compile_, number),
+            per_call(lambda: lookup(db, **filters), number)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""A concurrent-load benchmark for `app.py`.
+
+Serves the app on a threaded local server and measures requests per
+second while several client threads register, log in and fetch their
+profile at the same time.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+os.environ.setdefault("BCRYPT_COST", "4")
+# a throwaway database, so the benchmark never touches a.db
+_db_dir = tempfile.mkdtemp(prefix="bench_load.")
+os.environ["DB_URL"] = "sqlite:///" + os.path.join(_db_dir, "bench.db")
+
+from werkzeug.serving import WSGIRequestHandler, make_server  # noqa: E402
+
+from app import app  # noqa: E402
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    """Request handler that does not log every request.
+    """
+
+    def log_request(self, *args, **kwargs) -> None:
+        """Skips the access log line.
+        """
+
+
+def request(url: str, method: str = "GET", data: dict = None,
+            cookie: str = None) -> tuple:
+    """Sends one request and returns its status and Set-Cookie header.
+    """
+    body = urlencode(data).encode() if data is not None else None
+    req = Request(url, data=body, method=method)
+    if cookie is not None:
+        req.add_header("Cookie", cookie)
+    try:
+        with urlopen(req) as res:
+            return res.status, res.headers.get("Set-Cookie")
+    except HTTPError as e:
+        return e.code, None
+
+
+def client(base_url: str, client_id: int, rounds: int) -> int:
+    """Runs one client's register/login/profile rounds.
+    """
+    count = 0
+    for i in range(rounds):
+        form = {"email": "user{}-{}@hbtn.io".format(client_id, i),
+                "password": "pwd"}
+        status, _ = request(base_url + "/users", "POST", form)
+        assert status == 200, status
+        status, cookie = request(base_url + "/sessions", "POST", form)
+        assert status == 200, status
+        cookie = cookie.split(";")[0]
+        for _ in range(5):
+            status, _ = request(base_url + "/profile", cookie=cookie)
+            assert status == 200, status
+        count += 7
+    return count
+
+
+def main() -> None:
+    """Prints requests per second for several client thread counts.
+    """
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    server = make_server("127.0.0.1", 0, app, threaded=True,
+                         request_handler=QuietRequestHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = "http://127.0.0.1:{}".format(server.server_port)
+
+    print("{:>8} {:>10}".format("clients", "req/s"))
+    offset = 0
+    for clients in (1, 4, 16):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(clients) as executor:
+            total = sum(executor.map(
+                lambda c: client(base_url, offset + c, rounds),
+                range(clients)))
+        elapsed = time.perf_counter() - start
+        offset += clients
+        print("{:>8} {:>10.0f}".format(clients, total / elapsed))
+    server.shutdown()
+    shutil.rmtree(_db_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
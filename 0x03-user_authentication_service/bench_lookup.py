@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""A lookup-latency benchmark for `DB.find_user_by`.
+
+Fills the users table with 1k up to 1M rows and times lookups by email
+with and without the column's index.
+"""
+import sys
+import timeit
+
+from sqlalchemy import insert, text
+
+from db import DB
+from user import User
+
+
+def fill(db: DB, start: int, stop: int) -> None:
+    """Inserts users `start` to `stop` in batches.
+    """
+    session = db._session
+    for low in range(start, stop, 10000):
+        session.execute(insert(User), [
+            {"email": "user{}@hbtn.io".format(i), "hashed_password": "x"}
+            for i in range(low, min(low + 10000, stop))
+        ])
+    session.commit()
+
+
+def lookup_time(db: DB, email: str, number: int = 200) -> float:
+    """Returns the mean time of a lookup by email, in microseconds.
+    """
+    return timeit.timeit(lambda: db.find_user_by(email=email),
+                         number=number) / number * 1e6
+
+
+def main() -> None:
+    """Prints the lookup latency for each table size.
+    """
+    sizes = [int(n) for n in sys.argv[1:]] or [1000, 10000, 100000, 1000000]
+    db = DB("sqlite://", fresh=True)
+    rows = 0
+    print("{:>8} {:>14} {:>14}".format("rows", "indexed (us)", "scan (us)"))
+    for size in sorted(sizes):
+        fill(db, rows, size)
+        rows = size
+        email = "user{}@hbtn.io".format(size - 1)
+        indexed = lookup_time(db, email)
+        db._session.execute(text("DROP INDEX ix_users_email"))
+        scan = lookup_time(db, email, number=max(1, 200000 // size))
+        db._session.execute(
+            text("CREATE UNIQUE INDEX ix_users_email ON users (email)"))
+        db._session.commit()
+        print("{:>8} {:>14.1f} {:>14.1f}".format(size, indexed, scan))
+
+
+if __name__ == "__main__":
+    main()
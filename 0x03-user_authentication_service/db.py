@@ -1,44 +1,178 @@
 #!/usr/bin/env python3
 """DB module.
 """
-from sqlalchemy import create_engine, tuple_
-from sqlalchemy.exc import InvalidRequestError
+import os
+from functools import lru_cache
+from typing import Callable, List, Optional, Tuple
+from sqlalchemy import (Column, Integer, MetaData, Table, bindparam,
+                        create_engine, event, inspect, select, update)
+from sqlalchemy.engine import Connection, Engine, make_url
+from sqlalchemy.exc import IntegrityError, InvalidRequestError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy.orm.exc import NoResultFound
 from sqlalchemy.orm.session import Session
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.sql import Select
 
 from user import Base, User
 
 
+DEFAULT_DB_URL = "sqlite:///a.db"
+
+# names of the mapped columns users can be looked up and updated by
+USER_COLUMNS = frozenset(column.key for column in inspect(User).column_attrs)
+
+_schema_metadata = MetaData()
+schema_version = Table(
+    "schema_version", _schema_metadata,
+    Column("version", Integer, nullable=False),
+)
+
+
+def _create_schema(conn: Connection) -> None:
+    """Migration 1: the initial `users` table.
+    """
+    Base.metadata.create_all(conn)
+
+
+def _add_lookup_indexes(conn: Connection) -> None:
+    """Migration 2: unique indexes on the columns users are looked up by.
+    """
+    existing = {index["name"] for index in inspect(conn).get_indexes("users")}
+    for index in User.__table__.indexes:
+        if index.name not in existing:
+            index.create(conn)
+
+
+# Versioned schema changes, applied in order to databases below the
+# version; a brand new database gets the current schema straight away.
+MIGRATIONS: List[Tuple[int, Callable[[Connection], None]]] = [
+    (1, _create_schema),
+    (2, _add_lookup_indexes),
+]
+
+
+def migrate(engine: Engine) -> int:
+    """Brings the schema up to date without touching existing rows, and
+    returns the resulting schema version.
+    """
+    latest = MIGRATIONS[-1][0]
+    with engine.begin() as conn:
+        tables = inspect(conn).get_table_names()
+        _schema_metadata.create_all(conn)
+        version = conn.execute(select(schema_version.c.version)).scalar()
+        if version is None:
+            if User.__tablename__ not in tables:
+                Base.metadata.create_all(conn)
+                version = latest
+            else:
+                # a database created before versioning has the first schema
+                version = 1
+            conn.execute(schema_version.insert().values(version=version))
+    for target, apply in MIGRATIONS:
+        if target <= version:
+            continue
+        with engine.begin() as conn:
+            apply(conn)
+            conn.execute(schema_version.update().values(version=target))
+        version = target
+    return version
+
+
+def _create_engine(url: str) -> Engine:
+    """Creates an engine whose pool is configured from the `DB_POOL_SIZE`,
+    `DB_MAX_OVERFLOW` and `DB_POOL_RECYCLE` environment variables.
+    """
+    options = {"echo": False, "pool_pre_ping": True}
+    db_url = make_url(url)
+    is_sqlite = db_url.get_backend_name() == "sqlite"
+    in_memory = is_sqlite and db_url.database in (None, "", ":memory:")
+    if is_sqlite:
+        # connections are pooled across threads, but every thread works
+        # through its own scoped session and connection at a time
+        options["connect_args"] = {"check_same_thread": False}
+    if in_memory:
+        # one shared connection, or each thread would see its own database
+        options["poolclass"] = StaticPool
+    else:
+        options["pool_size"] = int(os.environ.get("DB_POOL_SIZE", 5))
+        options["max_overflow"] = int(os.environ.get("DB_MAX_OVERFLOW", 10))
+        options["pool_recycle"] = int(os.environ.get("DB_POOL_RECYCLE", 3600))
+    engine = create_engine(url, **options)
+    if is_sqlite and not in_memory:
+        @event.listens_for(engine, "connect")
+        def _set_sqlite_pragmas(dbapi_connection, connection_record):
+            """Lets readers and a writer work concurrently.
+            """
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute("PRAGMA busy_timeout=5000")
+            cursor.close()
+    return engine
+
+
+@lru_cache(maxsize=None)
+def _find_user_statement(columns: Tuple[str, ...]) -> Select:
+    """Builds the lookup statement for a sorted tuple of column names.
+
+    Values are bound at execution time, so each set of filter columns is
+    built once and its compiled form is reused from the engine's cache.
+    """
+    return select(User).where(
+        *(getattr(User, column) == bindparam(column) for column in columns)
+    ).limit(1)
+
+
 class DB:
     """DB class.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, url: str = None, fresh: bool = None) -> None:
         """Initialize a new DB instance.
+
+        The database URL defaults to the `DB_URL` environment variable,
+        then to `sqlite:///a.db`. Existing data is kept and the schema is
+        migrated, unless `fresh` (or `DB_RESET=1` in the environment)
+        asks for all tables to be dropped first; tests can use
+        `DB("sqlite://", fresh=True)` for a throwaway in-memory database.
         """
-        self._engine = create_engine("sqlite:///a.db", echo=False)
-        Base.metadata.drop_all(self._engine)
-        Base.metadata.create_all(self._engine)
-        self.__session = None
+        if url is None:
+            url = os.environ.get("DB_URL", DEFAULT_DB_URL)
+        if fresh is None:
+            fresh = os.environ.get("DB_RESET", "0") == "1"
+        self._engine = _create_engine(url)
+        if fresh:
+            Base.metadata.drop_all(self._engine)
+            _schema_metadata.drop_all(self._engine)
+        migrate(self._engine)
+        self.__session = scoped_session(sessionmaker(bind=self._engine))
 
     @property
     def _session(self) -> Session:
-        """Memoized session object.
+        """Session object of the calling thread.
         """
-        if self.__session is None:
-            DBSession = sessionmaker(bind=self._engine)
-            self.__session = DBSession()
-        return self.__session
+        return self.__session()
+
+    def remove_session(self) -> None:
+        """Closes the calling thread's session and returns its connection
+        to the pool; call it at the end of every request.
+        """
+        self.__session.remove()
 
     def add_user(self, email: str, hashed_password: str) -> User:
         """Adds a new user to the database.
+
+        Raises `IntegrityError` if the email is already registered.
         """
         try:
             new_user = User(email=email, hashed_password=hashed_password)
             self._session.add(new_user)
             self._session.commit()
+        except IntegrityError:
+            self._session.rollback()
+            raise
         except Exception:
             self._session.rollback()
             new_user = None
@@ -47,34 +181,46 @@ class DB:
     def find_user_by(self, **kwargs) -> User:
         """Finds a user based on a set of filters.
         """
-        fields, values = [], []
-        for key, value in kwargs.items():
-            if hasattr(User, key):
-                fields.append(getattr(User, key))
-                values.append(value)
-            else:
-                raise InvalidRequestError()
-        result = self._session.query(User).filter(
-            tuple_(*fields).in_([tuple(values)])
-        ).first()
+        if not USER_COLUMNS.issuperset(kwargs):
+            raise InvalidRequestError()
+        statement = _find_user_statement(tuple(sorted(kwargs)))
+        result = self._session.execute(statement, kwargs).scalar()
         if result is None:
             raise NoResultFound()
         return result
 
-    def update_user(self, user_id: int, **kwargs) -> None:
-        """Updates a user based on a given id.
+    def update_user(self, user_id: int, returning: bool = False,
+                    **kwargs) -> Optional[User]:
+        """Updates a user based on a given id, in a single UPDATE.
+
+        Raises `ValueError` for a column the users table does not have
+        and `NoResultFound` if no user has the id. With `returning`, the
+        updated user is returned as a detached object, read back through
+        RETURNING where the dialect supports it.
         """
-        user = self.find_user_by(id=user_id)
-        if user is None:
-            return
-        update_source = {}
-        for key, value in kwargs.items():
-            if hasattr(User, key):
-                update_source[getattr(User, key)] = value
-            else:
-                raise ValueError()
-        self._session.query(User).filter(User.id == user_id).update(
-            update_source,
-            synchronize_session=False,
-        )
+        if not USER_COLUMNS.issuperset(kwargs):
+            raise ValueError()
+        if not kwargs:
+            user = self.find_user_by(id=user_id)
+            return user if returning else None
+        statement = update(User).where(User.id == user_id).values(
+            **kwargs).execution_options(synchronize_session=False)
+        user = None
+        if returning and self._engine.dialect.update_returning:
+            user = self._session.execute(
+                statement.returning(User),
+                execution_options={"populate_existing": True},
+            ).scalar()
+            found = user is not None
+            if found:
+                # keeps the returned values from being expired by the commit
+                self._session.expunge(user)
+        else:
+            found = self._session.execute(statement).rowcount > 0
         self._session.commit()
+        if not found:
+            raise NoResultFound()
+        if returning and user is None:
+            user = self.find_user_by(id=user_id)
+            self._session.expunge(user)
+        return user